@@ -0,0 +1,61 @@
+import time
+from os.path import join
+
+import pygame
+
+# Registro de assets do processo: cada imagem/fonte é lida do disco uma única
+# vez, na primeira vez que for pedida, e compartilhada por todos os jogos.
+# Processos filhos criados por fork (ParallelEvaluator) herdam o que já foi
+# carregado, por isso o treino chama preload() antes de criar o pool.
+
+_cache = {}
+_load_times = {}
+
+
+def _get(key, loader):
+    asset = _cache.get(key)
+    if asset is None:
+        start = time.perf_counter()
+        asset = loader()
+        _load_times[key] = time.perf_counter() - start
+        _cache[key] = asset
+    return asset
+
+
+def image(*path):
+    return _get(('image', path), lambda: pygame.image.load(
+        join('images', *path)).convert_alpha())
+
+
+def font(name, size):
+    return _get(('font', name, size), lambda: pygame.font.Font(
+        join('images', name), size))
+
+
+def explosion_frames():
+    return _get(('frames', 'explosion'), lambda: [
+        image('explosion', f'{i}.png') for i in range(21)])
+
+
+def preload(render=False):
+    image('player.png')
+    image('meteor.png')
+    image('laser.png')
+    # Estrelas, fonte e explosões só existem quando há renderização
+    if render:
+        image('star.png')
+        font('Oxanium-Bold.ttf', 20)
+        explosion_frames()
+
+
+def report():
+    # A lista de frames só agrupa imagens que já foram contadas
+    files = [t for key, t in _load_times.items() if key[0] != 'frames']
+    print(f"Assets carregados: {len(files)} arquivos em "
+          f"{sum(files) * 1000:.1f} ms")
+
+
+def mask(*path):
+    # Máscara de colisão da imagem, gerada uma vez por processo
+    return _get(('mask', path), lambda: pygame.mask.from_surface(
+        image(*path)))
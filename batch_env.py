@@ -0,0 +1,228 @@
+import numpy as np
+
+import profiling
+from sensors import nearest_meteors_batch, radar_batch
+
+# N jogos do space_shooter_neat.py em structure-of-arrays: cada campo é um
+# array (N,) para o player ou (N, max_meteors) / (N, max_lasers) para os
+# objetos. Slots livres são marcados pelas máscaras *_alive. É o único
+# motor do space_shooter_neat.py: treino (N = população) e replay (N = 1).
+
+WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+
+# Tamanhos das imagens em images/ (player.png, meteor.png, laser.png)
+PLAYER_W, PLAYER_H = 112, 75
+METEOR_W, METEOR_H = 101, 84
+LASER_W, LASER_H = 9, 54
+
+# Colisão player x meteoro: círculos; com um hit_test (collision.PixelHits)
+# os pares que se tocam pelos círculos envolventes são decididos por pixel
+PLAYER_RADIUS = 36.0
+METEOR_RADIUS = 42.0
+
+PLAYER_SPEED = 300
+LASER_SPEED = 400
+LASER_COOLDOWN = 400  # ms
+METEOR_LIFE_TIME = 3000  # ms
+METEOR_SPAWN_INTERVAL = 0.2  # s
+
+
+class BatchSpaceShooter:
+    def __init__(self, n, seed=None, max_meteors=32, max_lasers=8,
+                 n_nearest=4, dt=1/60, sensor='nearest', num_sectors=16,
+                 common_random_numbers=True, hit_test=None):
+        self.n = n
+        # hit_test(dx, dy, ângulo) -> bool, com alcance hit_test.reach
+        self.hit_test = hit_test
+        if hit_test is None:
+            self.hit_reach = PLAYER_RADIUS + METEOR_RADIUS
+        else:
+            self.hit_reach = hit_test.reach
+        # Com common random numbers cada meteoro sorteado nasce igual em
+        # todos os jogos vivos; sem, cada jogo tem seu próprio sorteio
+        self.common_random_numbers = common_random_numbers
+        self.max_meteors = max_meteors
+        self.max_lasers = max_lasers
+        self.n_nearest = n_nearest
+        self.dt = dt
+        # 'nearest': k meteoros mais próximos; 'radar': setores do option.py
+        self.sensor = sensor
+        self.num_sectors = num_sectors
+        if sensor == 'radar':
+            self.obs_size = 2 + num_sectors + 1
+        else:
+            self.obs_size = 2 + 4 * n_nearest + 1
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        n, M, L = self.n, self.max_meteors, self.max_lasers
+
+        self.alive = np.ones(n, dtype=bool)
+        self.score = np.zeros(n)
+        self.time = np.zeros(n)  # relógio simulado em ms, por jogo
+        self.meteor_timer = 0.0
+
+        # Player
+        self.px = np.full(n, WINDOW_WIDTH / 2)
+        self.py = np.full(n, WINDOW_HEIGHT / 2)
+        self.pdx = np.zeros(n)
+        self.pdy = np.zeros(n)
+        self.can_shoot = np.ones(n, dtype=bool)
+        self.laser_shoot_time = np.zeros(n)
+
+        # Meteoros (N, M)
+        self.mx = np.zeros((n, M))
+        self.my = np.zeros((n, M))
+        self.mvx = np.zeros((n, M))
+        self.mvy = np.zeros((n, M))
+        self.mrot = np.zeros((n, M))
+        self.mrot_speed = np.zeros((n, M))
+        self.mborn = np.zeros((n, M))
+        self.m_alive = np.zeros((n, M), dtype=bool)
+
+        # Lasers (N, L)
+        self.lx = np.zeros((n, L))
+        self.ly = np.zeros((n, L))
+        self.l_alive = np.zeros((n, L), dtype=bool)
+
+        # Buffer de observação reaproveitado a cada passo
+        self.obs = np.zeros((n, self.obs_size))
+        return self.get_state()
+
+    @profiling.timed('env.step')
+    def step(self, actions):
+        actions = np.asarray(actions)
+        dt = self.dt
+        # Jogos mortos ficam congelados: dt zero e nenhuma ação
+        dt_env = np.where(self.alive, dt, 0.0)
+        self.time += dt_env * 1000
+
+        self._update_player(actions, dt_env)
+        self._update_lasers(dt_env)
+        self._update_meteors(dt_env)
+        died, destroyed = self._collisions()
+        self._spawn_meteors(dt)
+        self.score += dt_env
+
+        self.alive &= ~died
+        events = {'died': died, 'meteors_destroyed': destroyed}
+        return self.get_state(), self.alive.copy(), events
+
+    def _update_player(self, actions, dt_env):
+        dx = actions[:, 0].astype(float)
+        dy = actions[:, 1].astype(float)
+        length = np.hypot(dx, dy)
+        moving = length > 0
+        dx = np.divide(dx, length, out=np.zeros_like(dx), where=moving)
+        dy = np.divide(dy, length, out=np.zeros_like(dy), where=moving)
+        self.pdx = np.where(self.alive, dx, self.pdx)
+        self.pdy = np.where(self.alive, dy, self.pdy)
+
+        # Impede sair da tela
+        half_w, half_h = PLAYER_W / 2, PLAYER_H / 2
+        self.px = np.clip(self.px + dx * PLAYER_SPEED * dt_env,
+                          half_w, WINDOW_WIDTH - half_w)
+        self.py = np.clip(self.py + dy * PLAYER_SPEED * dt_env,
+                          half_h, WINDOW_HEIGHT - half_h)
+
+        shoot = (actions[:, 2] > 0) & self.can_shoot & self.alive
+        if shoot.any():
+            rows = np.flatnonzero(shoot)
+            slots = np.argmin(self.l_alive[rows], axis=1)
+            free = ~self.l_alive[rows, slots]
+            rows, slots = rows[free], slots[free]
+            # Laser nasce com midbottom no midtop do player
+            self.lx[rows, slots] = self.px[rows]
+            self.ly[rows, slots] = self.py[rows] - half_h - LASER_H / 2
+            self.l_alive[rows, slots] = True
+            self.can_shoot[shoot] = False
+            self.laser_shoot_time[shoot] = self.time[shoot]
+
+        recharged = self.time - self.laser_shoot_time >= LASER_COOLDOWN
+        self.can_shoot |= recharged
+
+    def _update_lasers(self, dt_env):
+        self.ly -= LASER_SPEED * dt_env[:, None]
+        self.l_alive &= self.ly + LASER_H / 2 >= 0
+
+    def _update_meteors(self, dt_env):
+        dt_col = dt_env[:, None]
+        self.mx += self.mvx * dt_col
+        self.my += self.mvy * dt_col
+        self.mrot += self.mrot_speed * dt_col
+        self.m_alive &= self.time[:, None] - self.mborn < METEOR_LIFE_TIME
+
+    @profiling.timed('env.collisions')
+    def _collisions(self):
+        # Player x meteoro: círculos, confirmados por pixel se houver
+        # hit_test (poucos pares passam pelos círculos envolventes)
+        dx = self.mx - self.px[:, None]
+        dy = self.my - self.py[:, None]
+        hit = self.m_alive & (dx * dx + dy * dy < self.hit_reach ** 2)
+        if self.hit_test is not None:
+            hit &= self.alive[:, None]
+            for row, col in zip(*np.nonzero(hit)):
+                hit[row, col] = self.hit_test(dx[row, col], dy[row, col],
+                                              self.mrot[row, col])
+        died = hit.any(axis=1) & self.alive
+        self.m_alive &= ~hit
+
+        # Laser x meteoro: bounding box do meteoro rotacionado x laser,
+        # um slot de laser por vez para não contar o mesmo meteoro duas vezes
+        theta = np.radians(self.mrot)
+        c, s = np.abs(np.cos(theta)), np.abs(np.sin(theta))
+        reach_x = (METEOR_W * c + METEOR_H * s) / 2 + LASER_W / 2
+        reach_y = (METEOR_W * s + METEOR_H * c) / 2 + LASER_H / 2
+        destroyed = np.zeros(self.n, dtype=int)
+        for j in np.flatnonzero(self.l_alive.any(axis=0)):
+            hit = (self.m_alive & self.l_alive[:, j, None]
+                   & (np.abs(self.mx - self.lx[:, j, None]) < reach_x)
+                   & (np.abs(self.my - self.ly[:, j, None]) < reach_y))
+            count = hit.sum(axis=1)
+            self.m_alive &= ~hit
+            self.l_alive[:, j] &= count == 0
+            destroyed += count
+        return died, destroyed
+
+    @profiling.timed('env.spawn_meteors')
+    def _spawn_meteors(self, dt):
+        self.meteor_timer += dt
+        if self.meteor_timer <= METEOR_SPAWN_INTERVAL:
+            return
+        self.meteor_timer = 0.0
+
+        rows = np.flatnonzero(self.alive)
+        slots = np.argmin(self.m_alive[rows], axis=1)
+        # Sem slot livre o meteoro é descartado (max_meteors cobre a vida útil)
+        free = ~self.m_alive[rows, slots]
+        rows, slots = rows[free], slots[free]
+        k = 1 if self.common_random_numbers else len(rows)
+
+        speed = self.rng.integers(400, 501, k)
+        self.mx[rows, slots] = self.rng.integers(0, WINDOW_WIDTH + 1, k)
+        self.my[rows, slots] = self.rng.integers(-200, -99, k)
+        self.mvx[rows, slots] = self.rng.uniform(-0.5, 0.5, k) * speed
+        self.mvy[rows, slots] = speed
+        self.mrot[rows, slots] = 0
+        self.mrot_speed[rows, slots] = self.rng.integers(40, 81, k)
+        self.mborn[rows, slots] = self.time[rows]
+        self.m_alive[rows, slots] = True
+
+    @profiling.timed('env.get_state')
+    def get_state(self):
+        n, k = self.n, self.n_nearest
+        obs = self.obs
+        obs[:, 0] = self.px / WINDOW_WIDTH * 2 - 1
+        obs[:, 1] = self.py / WINDOW_HEIGHT * 2 - 1
+        if self.sensor == 'radar':
+            radar_batch(self.px, self.py, self.mx, self.my, self.m_alive,
+                        self.num_sectors, obs[:, 2:-1])
+        else:
+            nearest_meteors_batch(self.px, self.py, self.mx, self.my,
+                                  self.mvx, self.mvy, self.m_alive, k,
+                                  obs[:, 2:-1].reshape(n, k, 4))
+        obs[:, -1] = self.can_shoot
+        return obs
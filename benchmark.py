@@ -0,0 +1,385 @@
+import argparse
+import functools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+import batch_env
+from evaluation import CommonSeedEvaluator
+from fitness_cache import FitnessCache
+from net_compiler import BatchedNetworks, CompiledNetwork
+import option
+import space_shooter_neat
+
+# Benchmarks do ambiente, das redes e de uma geração completa, com seeds
+# fixas. Resultados em JSON; --compare acusa regressões contra um baseline.
+#
+#   python benchmark.py [--quick] [--only texto] [--out arquivo.json]
+#   python benchmark.py --compare baseline.json [--current atual.json]
+#
+# Nos benchmarks de passo o número de meteoros é fixo: o campo é preenchido
+# no início de cada repetição, o spawn fica desligado e os meteoros caem na
+# vertical fora da coluna do player parado, então nenhum é destruído (a
+# contagem é conferida no fim de cada repetição).
+
+SEED = 1234
+DT = 1 / 60
+IDLE = (0, 0, 0)  # parado e sem atirar
+CONFIG_FILE = "config-feedforward.txt"
+DEFAULT_OUT = "benchmark.json"
+DEFAULT_THRESHOLD = 0.10  # 10% mais lento conta como regressão
+
+WINDOW_WIDTH, WINDOW_HEIGHT = batch_env.WINDOW_WIDTH, batch_env.WINDOW_HEIGHT
+# Meia largura da coluna do player sem meteoros: player + meteoro girado
+PLAYER_LANE = (batch_env.PLAYER_W / 2
+               + math.hypot(batch_env.METEOR_W, batch_env.METEOR_H) / 2 + 4)
+
+
+def best_time(func, repeat):
+    # Menor tempo entre as repetições: o menos afetado por ruído da máquina
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_config(pop_size=None):
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                         CONFIG_FILE)
+    if pop_size is not None:
+        config.pop_size = pop_size
+    return config
+
+
+def meteor_field(n):
+    # Posições espalhadas acima e dentro da tela, para o campo atravessar a
+    # tela durante a medição, fora da coluna do player (centro da tela)
+    rng = random.Random(SEED)
+    field = []
+    for _ in range(n):
+        x = rng.uniform(0, WINDOW_WIDTH - 2 * PLAYER_LANE)
+        if x > WINDOW_WIDTH / 2 - PLAYER_LANE:
+            x += 2 * PLAYER_LANE
+        field.append((x, rng.uniform(-WINDOW_HEIGHT, WINDOW_HEIGHT)))
+    return field
+
+
+def check_meteors(count, n):
+    if count != n:
+        raise RuntimeError(f"Benchmark de passo terminou com {count} "
+                           f"meteoros em vez de {n}")
+
+
+# --- Ambiente ---
+
+
+def fill_sprite_game(game, n):
+    game.reset(SEED)
+    game.meteor_timer = -float('inf')  # sem spawn
+    for pos in meteor_field(n):
+        meteor = game.meteor_pool.acquire(
+            (game.all_sprites, game.meteor_sprites), game.meteor_surf, pos,
+            game.rng)
+        meteor.life_time = float('inf')
+        meteor.direction.update(0, 1)
+
+
+def fill_batch_env(env, n):
+    env.reset(SEED)
+    env.meteor_timer = -float('inf')
+    field = np.array(meteor_field(n)).reshape(-1, 2)
+    env.mx[:, :n] = field[:, 0]
+    env.my[:, :n] = field[:, 1]
+    env.mvy[:, :n] = 450.0
+    env.mrot_speed[:, :n] = 60.0
+    env.mborn[:, :n] = float('inf')
+    env.m_alive[:, :n] = True
+
+
+def bench_step(quick):
+    results = []
+    steps = 60 if quick else 120
+    repeat = 3 if quick else 5
+    for n in (8, 32, 64):
+        game = option.SpaceShooterGame(render=False, seed=SEED)
+
+        def run():
+            fill_sprite_game(game, n)
+            for _ in range(steps):
+                game.step(IDLE, DT)
+            check_meteors(len(game.meteor_sprites), n)
+        results.append(('step.sprite', {'meteors': n},
+                        steps / best_time(run, repeat), 'passos/s'))
+
+        envs = 80
+        env = batch_env.BatchSpaceShooter(envs, seed=SEED,
+                                          max_meteors=max(n, 1))
+        actions = np.zeros((envs, 3))
+
+        def run():
+            fill_batch_env(env, n)
+            for _ in range(steps):
+                env.step(actions)
+            check_meteors(env.m_alive.sum(axis=1).min(), n)
+        results.append(('step.batch', {'meteors': n, 'envs': envs},
+                        envs * steps / best_time(run, repeat), 'passos/s'))
+    return results
+
+
+def bench_get_state(quick):
+    results = []
+    calls = 500 if quick else 2000
+    repeat = 3 if quick else 5
+    for n in (8, 32, 64):
+        # Radar: o sensor do option.py
+        game = option.SpaceShooterGame(render=False, seed=SEED)
+        fill_sprite_game(game, n)
+
+        def run():
+            for _ in range(calls):
+                game.get_state()
+        results.append(('get_state.radar', {'meteors': n},
+                        calls / best_time(run, repeat), 'chamadas/s'))
+
+        envs = 80
+        for sensor in ('nearest', 'radar'):
+            env = batch_env.BatchSpaceShooter(envs, seed=SEED,
+                                              max_meteors=max(n, 1),
+                                              sensor=sensor)
+            fill_batch_env(env, n)
+
+            def run():
+                for _ in range(calls // 10):
+                    env.get_state()
+            results.append((f'get_state.batch_{sensor}',
+                            {'meteors': n, 'envs': envs},
+                            envs * (calls // 10) / best_time(run, repeat),
+                            'observações/s'))
+    return results
+
+
+# --- Redes ---
+
+
+def grown_genome(config, hidden):
+    # Genoma com `hidden` nós ocultos, crescido por mutações estruturais
+    genome_config = config.genome_config
+    genome = config.genome_type(0)
+    genome.configure_new(genome_config)
+    while len(genome.nodes) - genome_config.num_outputs < hidden:
+        genome.mutate_add_node(genome_config)
+        genome.mutate_add_connection(genome_config)
+    return genome
+
+
+def bench_networks(quick):
+    results = []
+    calls = 1000 if quick else 5000
+    repeat = 3 if quick else 5
+    config = load_config()
+    inputs = np.random.default_rng(SEED).uniform(
+        -1, 1, config.genome_config.num_inputs)
+    for hidden in (0, 8, 32):
+        random.seed(SEED)
+        genome = grown_genome(config, hidden)
+        params = {'hidden': hidden,
+                  'connections': sum(cg.enabled
+                                     for cg in genome.connections.values())}
+        for name, net, x in (
+                ('activate.neat', neat.nn.FeedForwardNetwork.create(
+                    genome, config), list(inputs)),
+                ('activate.compiled', CompiledNetwork.create(genome, config),
+                 inputs)):
+            def run():
+                for _ in range(calls):
+                    net.activate(x)
+            results.append((name, params, calls / best_time(run, repeat),
+                            'ativações/s'))
+
+        population = 80
+        random.seed(SEED)
+        nets = BatchedNetworks.create(
+            [grown_genome(config, hidden) for _ in range(population)], config)
+        batch = np.tile(inputs, (population, 1))
+
+        def run():
+            for _ in range(calls // 10):
+                nets.activate(batch)
+        results.append(('activate.batched', dict(params, genomes=population),
+                        population * (calls // 10) / best_time(run, repeat),
+                        'ativações/s'))
+    return results
+
+
+# --- Geração completa ---
+
+
+def population_genomes(pop_size):
+    random.seed(SEED)
+    np.random.seed(SEED)
+    config = load_config(pop_size)
+    population = neat.Population(config)
+    return config, list(population.population.items())
+
+
+def bench_generation(quick):
+    results = []
+    sizes = (80,) if quick else (80, 160)
+    for pop_size in sizes:
+        config, genomes = population_genomes(pop_size)
+
+        def run():
+            # Cache e seed zerados: toda repetição simula a geração inteira
+            random.seed(SEED)
+            space_shooter_neat.fitness_cache = FitnessCache()
+            space_shooter_neat.eval_seed.update(generation=0, seed=None)
+            space_shooter_neat.eval_genomes(genomes, config)
+        results.append(('generation.eval_genomes', {'pop_size': pop_size},
+                        best_time(run, 1 if quick else 2), 's'))
+
+        workers = os.cpu_count()
+        params = {'pop_size': pop_size, 'workers': workers,
+                  'episodes': option.N_EPISODES}
+        # neat.ParallelEvaluator de referência, com as mesmas seeds em todos
+        # os genomas para o trabalho ser igual entre execuções
+        seeds = [SEED + i for i in range(option.N_EPISODES)]
+        evaluator = neat.ParallelEvaluator(
+            workers, functools.partial(option.eval_single_genome,
+                                       seeds=seeds))
+        try:
+            results.append(('generation.parallel', params,
+                            best_time(lambda: evaluator.evaluate(
+                                genomes, config), 1), 's'))
+        finally:
+            evaluator.pool.close()
+            evaluator.pool.join()
+
+        # O avaliador usado no treino do option.py
+        evaluator = CommonSeedEvaluator(workers, option.eval_single_genome,
+                                        option.N_EPISODES, seed=SEED)
+        try:
+            def run():
+                evaluator.rng.seed(SEED)
+                evaluator.seeds = None
+                evaluator.generation = 0
+                evaluator.evaluate(genomes, config)
+            results.append(('generation.common_seed', params,
+                            best_time(run, 1), 's'))
+        finally:
+            evaluator.close()
+    return results
+
+
+BENCHMARKS = [
+    ('step', bench_step),
+    ('get_state', bench_get_state),
+    ('activate', bench_networks),
+    ('generation', bench_generation),
+]
+
+
+def result_key(name, params):
+    return name + ''.join(f' {k}={v}' for k, v in sorted(params.items()))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(quick=False, only=None):
+    results = {}
+    for group, bench in BENCHMARKS:
+        if only and only not in group:
+            continue
+        for name, params, value, unit in bench(quick):
+            key = result_key(name, params)
+            # Tempos (s) são melhores menores; taxas, maiores
+            results[key] = {'value': value, 'unit': unit,
+                            'higher_is_better': unit != 's'}
+            print(f"{key:<55} {value:14.1f} {unit}")
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'quick': quick,
+            'seed': SEED,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # Devolve o número de regressões (piora maior que `threshold`)
+    regressions = 0
+    print(f"{'benchmark':<55} {'baseline':>12} {'atual':>12} {'mudança':>9}")
+    for key, base in baseline['results'].items():
+        cur = current['results'].get(key)
+        if cur is None:
+            print(f"{key:<55} {base['value']:12.1f} {'-':>12}")
+            continue
+        change = cur['value'] / base['value'] - 1
+        worse = -change if base['higher_is_better'] else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSÃO'
+            regressions += 1
+        elif worse < -threshold:
+            flag = '  melhora'
+        print(f"{key:<55} {base['value']:12.1f} {cur['value']:12.1f} "
+              f"{100 * change:+8.1f}%{flag}")
+    print(f"{regressions} regressões (limite {100 * threshold:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true',
+                        help='menos repetições e tamanhos')
+    parser.add_argument('--only', help='só grupos que contêm este texto')
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compara com um JSON salvo antes')
+    parser.add_argument('--current', help='JSON atual (sem ele, roda agora)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare and args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.quick, args.only)
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=2)
+        print("Resultados salvos em", args.out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import glob
+import gzip
+import os
+import pickle
+import queue
+import random
+import re
+import threading
+import time
+from itertools import count
+
+import neat
+import numpy as np
+
+# Checkpoints do treino NEAT. Diferente do neat.Checkpointer, o snapshot
+# guarda também os contadores de genoma, de nó e de espécie (sem eles, o
+# resume repete ids), o melhor genoma e os estados do random e do numpy. Só
+# o pickle acontece no loop de gerações; compressão e escrita ficam numa
+# thread.
+
+DEFAULT_DIRECTORY = 'checkpoints'
+DEFAULT_PREFIX = 'neat-checkpoint-'
+
+
+def _next_value(counter):
+    # Lê o próximo valor de um itertools.count sem consumi-lo
+    value = next(counter)
+    return value, count(value)
+
+
+class AsyncCheckpointer(neat.reporting.BaseReporter):
+    def __init__(self, population, generation_interval=5, keep=3,
+                 directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX,
+                 compresslevel=6, extra_state=None):
+        # extra_state() -> dados extras do treino (ex.: seeds do avaliador)
+        self.population = population
+        self.generation_interval = generation_interval
+        self.keep = keep
+        self.directory = directory
+        self.prefix = prefix
+        self.compresslevel = compresslevel
+        self.extra_state = extra_state
+        self.current_generation = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.jobs = queue.Queue()
+        self.done = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def start_generation(self, generation):
+        self.current_generation = generation
+
+    def end_generation(self, config, population, species_set):
+        self._report_written()
+        # population já é a da próxima geração, ainda não avaliada
+        generation = self.current_generation + 1
+        if generation % self.generation_interval == 0:
+            self.save(config, population, species_set, generation)
+
+    def save(self, config, population, species_set, generation):
+        start = time.perf_counter()
+        p = self.population
+        next_genome_id, p.reproduction.genome_indexer = _next_value(
+            p.reproduction.genome_indexer)
+        genome_config = config.genome_config
+        next_node_id = None
+        if genome_config.node_indexer is not None:
+            next_node_id, genome_config.node_indexer = _next_value(
+                genome_config.node_indexer)
+        next_species_id, species_set.indexer = _next_value(
+            species_set.indexer)
+        snapshot = {
+            'generation': generation,
+            'config': config,
+            'population': population,
+            'species_set': species_set,
+            'best_genome': p.best_genome,
+            'ancestors': p.reproduction.ancestors,
+            'next_genome_id': next_genome_id,
+            'next_node_id': next_node_id,
+            'next_species_id': next_species_id,
+            'random_state': random.getstate(),
+            'numpy_state': np.random.get_state(),
+            'extra': self.extra_state() if self.extra_state else None,
+        }
+        # O species_set guarda os reporters (este inclusive, com a thread);
+        # eles ficam fora do snapshot e são religados no restore. Os
+        # indexers são itertools.count, que não devem ser pickled (os
+        # próximos ids já vão em next_node_id e next_species_id)
+        reporters, species_set.reporters = species_set.reporters, None
+        node_indexer, genome_config.node_indexer = (
+            genome_config.node_indexer, None)
+        species_indexer, species_set.indexer = species_set.indexer, None
+        try:
+            data = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            species_set.reporters = reporters
+            genome_config.node_indexer = node_indexer
+            species_set.indexer = species_indexer
+        path = os.path.join(self.directory, f"{self.prefix}{generation}.gz")
+        self.jobs.put((generation, path, data,
+                       time.perf_counter() - start))
+
+    def close(self):
+        # Espera as escritas pendentes (fim do treino)
+        self.jobs.join()
+        self._report_written()
+
+    def _write_loop(self):
+        while True:
+            generation, path, data, pickle_time = self.jobs.get()
+            try:
+                start = time.perf_counter()
+                compressed = gzip.compress(data, self.compresslevel)
+                # Escreve num temporário e renomeia: um crash no meio da
+                # escrita não deixa checkpoint corrompido
+                tmp = path + '.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp, path)
+                self._apply_retention()
+                self.done.put((generation, path, len(data), len(compressed),
+                               pickle_time, time.perf_counter() - start))
+            except OSError as e:
+                self.done.put((generation, path, e))
+            finally:
+                self.jobs.task_done()
+
+    def _apply_retention(self):
+        for path in list_checkpoints(self.directory, self.prefix)[:-self.keep]:
+            os.remove(path)
+
+    def _report_written(self):
+        while not self.done.empty():
+            result = self.done.get()
+            if len(result) == 3:
+                generation, path, error = result
+                print(f"Checkpoint {generation} falhou: {error}")
+                continue
+            generation, path, raw, size, pickle_time, write_time = result
+            print(f"Checkpoint {generation}: {path} "
+                  f"({size / 1024:.0f} KB, {raw / 1024:.0f} KB sem "
+                  f"compressão) pickle {1000 * pickle_time:.0f} ms, "
+                  f"escrita {1000 * write_time:.0f} ms em segundo plano")
+
+
+def list_checkpoints(directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX):
+    # Checkpoints em ordem de geração
+    pattern = re.compile(re.escape(prefix) + r'(\d+)\.gz$')
+    found = []
+    for path in glob.glob(os.path.join(directory, prefix + '*.gz')):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            found.append((int(match.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+def latest_checkpoint(directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX):
+    paths = list_checkpoints(directory, prefix)
+    return paths[-1] if paths else None
+
+
+def restore(path):
+    # -> (Population pronta para p.run, extra_state salvo)
+    with gzip.open(path) as f:
+        snapshot = pickle.load(f)
+    config = snapshot['config']
+    p = neat.Population(config, (snapshot['population'],
+                                 snapshot['species_set'],
+                                 snapshot['generation']))
+    p.species.reporters = p.reporters
+    p.species.indexer = count(snapshot['next_species_id'])
+    p.best_genome = snapshot['best_genome']
+    p.reproduction.ancestors = snapshot['ancestors']
+    p.reproduction.genome_indexer = count(snapshot['next_genome_id'])
+    if snapshot['next_node_id'] is not None:
+        config.genome_config.node_indexer = count(snapshot['next_node_id'])
+    random.setstate(snapshot['random_state'])
+    np.random.set_state(snapshot['numpy_state'])
+    return p, snapshot['extra']
@@ -0,0 +1,164 @@
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+from evaluation import CommonSeedEvaluator
+from net_compiler import BatchedNetworks, CompiledNetwork
+import option
+import option2
+import space_shooter_neat
+
+# Verificações de consistência entre os caminhos otimizados e as
+# referências (neat.nn.FeedForwardNetwork etc.), com seeds fixas. Sai com
+# código 1 se alguma falhar.
+#
+#   python checks.py
+
+SEED = 1234
+CONFIG_FILE = "config-feedforward.txt"
+# Ativações com versão numpy e algumas que caem no fallback elemento a
+# elemento (gauss, sin)
+ACTIVATIONS = ('relu', 'sigmoid', 'tanh', 'identity', 'clamped', 'abs',
+               'gauss', 'sin')
+
+
+def load_config():
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                       neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                       CONFIG_FILE)
+
+
+def random_genomes(config, count, rng):
+    # Genomas da config real, crescidos por mutações estruturais, com
+    # ativações e responses variados
+    genome_config = config.genome_config
+    genomes = []
+    for key in range(count):
+        genome = config.genome_type(key)
+        genome.configure_new(genome_config)
+        for _ in range(rng.randrange(12)):
+            genome.mutate_add_node(genome_config)
+            genome.mutate_add_connection(genome_config)
+        for cg in genome.connections.values():
+            if rng.random() < 0.1:
+                cg.enabled = False
+        for ng in genome.nodes.values():
+            ng.activation = rng.choice(ACTIVATIONS)
+            ng.response = rng.uniform(-2.0, 2.0)
+        genomes.append(genome)
+    return genomes
+
+
+def check_networks():
+    random.seed(SEED)
+    rng = random.Random(SEED)
+    config = load_config()
+    genomes = random_genomes(config, 40, rng)
+    inputs = np.random.default_rng(SEED).uniform(
+        -1, 1, (len(genomes), config.genome_config.num_inputs))
+
+    expected = np.array([
+        neat.nn.FeedForwardNetwork.create(genome, config).activate(list(x))
+        for genome, x in zip(genomes, inputs)])
+    compiled = np.array([
+        CompiledNetwork.create(genome, config).activate(x)
+        for genome, x in zip(genomes, inputs)])
+    nets = BatchedNetworks.create(genomes, config)
+    batched = nets.activate(inputs)
+    # Só parte das redes viva: caminho empacotado do BatchedNetworks
+    alive = np.arange(len(genomes)) % 3 != 0
+    partial = nets.activate(inputs, alive)
+
+    failures = []
+    if not np.allclose(compiled, expected):
+        failures.append("CompiledNetwork difere do FeedForwardNetwork")
+    if not np.allclose(batched, expected):
+        failures.append("BatchedNetworks difere do FeedForwardNetwork")
+    if not np.allclose(partial[alive], expected[alive]):
+        failures.append("BatchedNetworks com alive difere do "
+                        "FeedForwardNetwork")
+    if partial[~alive].any():
+        failures.append("BatchedNetworks devolveu saída para rede morta")
+    return failures
+
+
+def check_replay_neat():
+    # Geração do treino do space_shooter_neat e replay de cada genoma na
+    # seed gravada, com desenho ligado
+    random.seed(SEED)
+    config = load_config()
+    genomes = random_genomes(config, 30, random.Random(SEED))
+    space_shooter_neat.fitness_cache = space_shooter_neat.FitnessCache()
+    space_shooter_neat.eval_genomes(list(enumerate(genomes)), config)
+
+    failures = []
+    for genome in genomes:
+        game, step = space_shooter_neat.replay(genome, config, render=True)
+        while game.running:
+            step()
+        if not np.isclose(game.fitness, genome.fitness):
+            failures.append(f"genoma {genome.key}: replay {game.fitness} "
+                            f"!= treino {genome.fitness}")
+    return failures
+
+
+def check_replay_option(module):
+    # Geração avaliada pelo CommonSeedEvaluator (um worker) e replay das
+    # seeds gravadas em cada genoma num jogo com desenho ligado
+    def check():
+        random.seed(SEED)
+        config = load_config()
+        genomes = random_genomes(config, 20, random.Random(SEED))
+        evaluator = CommonSeedEvaluator(1, module.eval_single_genome,
+                                        module.N_EPISODES, seed=SEED)
+        try:
+            evaluator.evaluate(list(enumerate(genomes)), config)
+        finally:
+            evaluator.close()
+
+        num_sectors = config.genome_config.num_inputs - 3
+        game = module.SpaceShooterGame(render=True, num_sectors=num_sectors)
+        failures = []
+        for genome in genomes:
+            net = CompiledNetwork.create(genome, config)
+            episode_fitness = []
+            for seed in genome.eval_seeds:
+                episode = module.Episode(game, net, seed)
+                while episode.step():
+                    pass
+                episode_fitness.append(episode.fitness)
+            fitness = sum(episode_fitness) / len(episode_fitness)
+            if not np.isclose(fitness, genome.fitness):
+                failures.append(f"genoma {genome.key}: replay {fitness} "
+                                f"!= treino {genome.fitness}")
+        return failures
+    return check
+
+
+CHECKS = [
+    ('redes compiladas = FeedForwardNetwork', check_networks),
+    ('replay = treino (space_shooter_neat)', check_replay_neat),
+    ('replay = treino (option)', check_replay_option(option)),
+    ('replay = treino (option2)', check_replay_option(option2)),
+]
+
+
+def main():
+    failed = 0
+    for name, check in CHECKS:
+        failures = check()
+        print(f"{'OK' if not failures else 'FALHOU':<7} {name}")
+        for failure in failures:
+            print("        ", failure)
+        failed += bool(failures)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
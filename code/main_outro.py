@@ -1,13 +1,132 @@
 import pygame
-from os.path import join
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, dirname, join
 from random import randint, uniform
 
+# The rotation cache and collision helpers are shared with the training
+# scripts in the repository root
+sys.path.insert(0, join(dirname(abspath(__file__)), '..'))
+from collision import collide_mask_fast
+from dirty_render import DirtyRenderer, bake_starfield
+import fixed_step
+import rotation_cache
+
+# Fixed-step loop: the simulation always advances in SIM_DT steps and the
+# screen is drawn at up to FPS_CAP frames per second, interpolating between
+# the last two simulation states.
+SIM_DT = 1 / 60
+FPS_CAP = 120  # 0 = uncapped (busy-loops a whole core)
+METEOR_INTERVAL = 0.5  # seconds of simulated time between meteors
+ROTATION_STEP = 2  # degrees, same quantization as the training scripts
+MUSIC_VOLUME = 0.08
+# Needed before the first frame; everything else is picked up in-game
+CRITICAL_ASSETS = ('player.png', 'star.png', 'meteor.png', 'laser.png', 'font')
+# name, file, volume, voices
+SOUND_EFFECTS = (('laser', 'laser.wav', 0.2, 2),
+                 ('explosion', 'explosion.wav', 0.2, 4),
+                 ('damage', 'damage.ogg', 1.0, 1))
+
+
+# Simulated time in ms: the timers use it instead of pygame.time.get_ticks()
+# so they only advance with the simulation steps
+sim_ticks = 0.0
+
+
+class AssetLoader:
+    # Reads and decodes asset files on a worker thread, in request order,
+    # while the main thread keeps the window responsive. convert_alpha()
+    # needs the display, so images are converted when picked up.
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = {}
+        self.failed = set()
+
+    def load(self, name, loader, *args):
+        self.futures[name] = self.executor.submit(loader, *args)
+
+    def done(self, *names):
+        return all(self.futures[name].done() for name in names)
+
+    def progress(self, names):
+        return sum(self.futures[name].done() for name in names) / len(names)
+
+    def ready(self, name):
+        # Loaded without error. A failed load is reported once and then
+        # never becomes ready, so the game carries on without that asset
+        future = self.futures[name]
+        if not future.done() or name in self.failed:
+            return False
+        error = future.exception()
+        if error is not None:
+            print(f"Could not load {name}: {error}")
+            self.failed.add(name)
+            return False
+        return True
+
+    def get(self, name):
+        # re-raises any error from the worker thread
+        return self.futures[name].result()
+
+    def close(self):
+        # Drop the loads that haven't started and wait for the one being
+        # decoded, so pygame.quit never runs under the worker thread
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def load_explosion_frames():
+    return [pygame.image.load(join('images', 'explosion', f'{i}.png'))
+            for i in range(21)]
+
+
+def request_assets(loader):
+    for name in ('player.png', 'star.png', 'meteor.png', 'laser.png'):
+        loader.load(name, pygame.image.load, join('images', name))
+    loader.load('font', pygame.font.Font,
+                join('images', 'Oxanium-Bold.ttf'), 20)
+    # non-critical: queued after the critical ones
+    loader.load('explosion_frames', load_explosion_frames)
+    for name, file, volume, voices in SOUND_EFFECTS:
+        loader.load(file, pygame.mixer.Sound, join('audio', file))
+
+
+class SfxPool:
+    # Each effect plays on its own reserved channels, with a fixed number of
+    # voices. Voices are reused round-robin, so when all are busy the oldest
+    # one is cut: an explosion storm can't take channels from other effects
+    # and the mixer never has more than the reserved voices to mix.
+    def __init__(self):
+        self.sounds = {}
+        self.channels = {}
+        self.next_voice = {}
+        self.reserved = 0
+
+    def add(self, name, sound, volume, voices):
+        sound.set_volume(volume)
+        first = self.reserved
+        self.reserved += voices
+        pygame.mixer.set_num_channels(max(self.reserved, 8))
+        # Sound.play() without a channel never picks a reserved one
+        pygame.mixer.set_reserved(self.reserved)
+        self.sounds[name] = sound
+        self.channels[name] = [pygame.mixer.Channel(i)
+                               for i in range(first, self.reserved)]
+        self.next_voice[name] = 0
+
+    def play(self, name):
+        if name not in self.sounds:
+            return  # still loading
+        channels = self.channels[name]
+        voice = self.next_voice[name]
+        self.next_voice[name] = (voice + 1) % len(channels)
+        channels[voice].play(self.sounds[name])
+
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, groups):
         super().__init__(groups)
-        self.image = pygame.image.load(
-            join('images', 'player.png')).convert_alpha()
+        self.image = player_surf
         self.rect = self.image.get_frect(
             center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
         self.direction = pygame.math.Vector2()
@@ -15,16 +134,16 @@ class Player(pygame.sprite.Sprite):
 
         # Cooldown
         self.can_shoot = True
+        self.shoot_requested = False  # latched on KEYDOWN, used by the next step
         self.laser_shoot_time = 0
         self.cooldown_duration = 400
 
         # Mask
-        # self.mask = pygame.mask.from_surface(self.image)
+        self.mask = pygame.mask.from_surface(self.image)
 
     def laser_timer(self):
         if not self.can_shoot:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.laser_shoot_time >= self.cooldown_duration:
+            if sim_ticks - self.laser_shoot_time >= self.cooldown_duration:
                 self.can_shoot = True
 
     def update(self, dt):
@@ -34,26 +153,16 @@ class Player(pygame.sprite.Sprite):
         self.direction = self.direction.normalize() if self.direction else self.direction
         self.rect.center += self.direction * self.speed * dt
 
-        recent_keys = pygame.key.get_just_pressed()
-
-        if recent_keys[pygame.K_SPACE] and self.can_shoot:
+        if self.shoot_requested and self.can_shoot:
             Laser(laser_surf, self.rect.midtop, (all_sprites, laser_sprites))
             self.can_shoot = False
-            self.laser_shoot_time = pygame.time.get_ticks()
-            laser_sound.play()
+            self.laser_shoot_time = sim_ticks
+            sfx.play('laser')
+        self.shoot_requested = False
 
         self.laser_timer()
 
 
-class Star(pygame.sprite.Sprite):
-
-    def __init__(self, groups, surf):
-        super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_frect(
-            center=(randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT)))
-
-
 class Laser(pygame.sprite.Sprite):
 
     def __init__(self, surf, pos, groups):
@@ -68,13 +177,13 @@ class Laser(pygame.sprite.Sprite):
 
 
 class Meteor(pygame.sprite.Sprite):
-
     def __init__(self, surf, pos, groups):
         super().__init__(groups)
-        self.original_surf = surf
-        self.image = self.original_surf
+        self.rotations = rotation_cache.get_rotation_cache(
+            'meteor', surf, ROTATION_STEP)
+        self.image, self.mask = self.rotations.get(0)
         self.rect = self.image.get_frect(center=pos)
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = sim_ticks
         self.life_time = 3000
         self.direction = pygame.Vector2(uniform(-0.5, 0.5), 1)
         self.speed = randint(400, 500)
@@ -83,11 +192,10 @@ class Meteor(pygame.sprite.Sprite):
 
     def update(self, dt):
         self.rect.center += self.direction * self.speed * dt
-        if pygame.time.get_ticks() - self.start_time >= self.life_time:
+        if sim_ticks - self.start_time >= self.life_time:
             self.kill()
         self.rotation += self.rotation_speed * dt
-        self.image = pygame.transform.rotozoom(
-            self.original_surf, self.rotation, 1)
+        self.image, self.mask = self.rotations.get(self.rotation)
         self.rect = self.image.get_frect(center=self.rect.center)
 
 
@@ -98,7 +206,7 @@ class AnimatedExplosion(pygame.sprite.Sprite):
         self.frame_index = 0
         self.image = self.frames[self.frame_index]
         self.rect = self.image.get_frect(center=pos)
-        explosion_sound.play()
+        sfx.play('explosion')
 
     def update(self, dt):
         self.frame_index += 25 * dt
@@ -108,10 +216,36 @@ class AnimatedExplosion(pygame.sprite.Sprite):
             self.kill()
 
 
+class ScoreHud:
+    # The score string only changes every 100 ms: text and rounded border
+    # are rendered into one surface when it changes and just blitted on the
+    # other frames, so there is no per-frame font rasterization
+    def __init__(self, font, color='#cdcdcd'):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.image = None
+        self.rect = None
+
+    def render(self, text):
+        if text != self.text:
+            text_surf = self.font.render(text, True, self.color)
+            text_rect = text_surf.get_frect(
+                midbottom=(WINDOW_WIDTH/2, WINDOW_HEIGHT - 25))
+            self.rect = pygame.Rect(text_rect.inflate(20, 20).move(0, -4))
+            self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            pygame.draw.rect(self.image, self.color,
+                             self.image.get_rect(), 4, 8)
+            self.image.blit(text_surf, text_rect.move(-self.rect.x,
+                                                      -self.rect.y))
+            self.text = text
+        return self.image, self.rect
+
+
 def collisions():
     global running
     collision_sprites = pygame.sprite.spritecollide(
-        player, meteor_sprites, True, pygame.sprite.collide_mask)
+        player, meteor_sprites, True, collide_mask_fast)
     if collision_sprites:
         return True  # Collision occurred, game over
 
@@ -120,88 +254,154 @@ def collisions():
             laser, meteor_sprites, True)
         if collided_sprites:
             laser.kill()
-            AnimatedExplosion(explosion_frames, laser.rect.midtop, all_sprites)
+            if explosion_frames is not None:
+                AnimatedExplosion(explosion_frames, laser.rect.midtop,
+                                  all_sprites)
     return False  # No collision
 
 
+def simulate(dt):
+    # One fixed step; True when the player was hit
+    global meteor_timer, sim_ticks
+    sim_ticks += dt * 1000
+    meteor_timer += dt
+    if meteor_timer >= METEOR_INTERVAL:
+        meteor_timer -= METEOR_INTERVAL
+        x, y = randint(0, WINDOW_WIDTH), randint(-200, -100)
+        Meteor(meteor_surf, (x, y), (all_sprites, meteor_sprites))
+
+    # positions before the step, for drawing in between steps
+    fixed_step.remember_positions(all_sprites)
+    all_sprites.update(dt)
+    return collisions()
+
+
+def draw_loading_screen(progress):
+    # the font isn't loaded yet: just a progress bar
+    display_surface.fill('#04010f')
+    bar = pygame.Rect(0, 0, 400, 16)
+    bar.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+    pygame.draw.rect(display_surface, '#cdcdcd', bar, 2, 4)
+    fill = bar.inflate(-6, -6)
+    fill.width = int(fill.width * progress)
+    pygame.draw.rect(display_surface, '#cdcdcd', fill)
+    pygame.display.update()
+
+
+def pick_up_deferred_assets():
+    # non-critical assets join the game as soon as the loader has them
+    global explosion_frames
+    if explosion_frames is None and loader.ready('explosion_frames'):
+        explosion_frames = [frame.convert_alpha()
+                            for frame in loader.get('explosion_frames')]
+    for name, file, volume, voices in SOUND_EFFECTS:
+        if name not in sfx.sounds and loader.ready(file):
+            sfx.add(name, loader.get(file), volume, voices)
+
+
+def start_music():
+    # Streamed from disk instead of decoding the whole track up front. A
+    # missing or undecodable track (or no audio device) just means no music
+    try:
+        pygame.mixer.music.load(join('audio', 'game_music.wav'))
+    except (pygame.error, FileNotFoundError) as error:
+        print(f"Playing without music: {error}")
+        return
+    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+    pygame.mixer.music.play(loops=-1)
+
+
 def display_score():
-    current_time = pygame.time.get_ticks() // 100
-    text_surf = font.render(str(current_time), True, '#cdcdcd')
-    text_rect = text_surf.get_frect(
-        midbottom=(WINDOW_WIDTH/2, WINDOW_HEIGHT - 25))
-    display_surface.blit(text_surf, text_rect)
-    pygame.draw.rect(display_surface, '#cdcdcd',
-                     text_rect.inflate(20, 20).move(0, -4), 4, 8)
-    return current_time
+    current_time = int(sim_ticks) // 100
+    hud_surf, hud_rect = score_hud.render(str(current_time))
+    border_rect = display_surface.blit(hud_surf, hud_rect)
+    return current_time, border_rect
 
 
 def main():
-    global display_surface, clock, all_sprites, meteor_sprites, laser_sprites, player, star_surf, meteor_surf, laser_surf, font, explosion_frames, laser_sound, explosion_sound, damage_sound, game_music, WINDOW_WIDTH, WINDOW_HEIGHT
+    global display_surface, clock, loader, all_sprites, meteor_sprites, laser_sprites, player, player_surf, star_surf, meteor_surf, laser_surf, font, explosion_frames, sfx, WINDOW_WIDTH, WINDOW_HEIGHT, sim_ticks, meteor_timer, score_hud
 
     # General setup
+    start_time = time.perf_counter()
     pygame.init()
     WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
     display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption('Space Shooter')
     clock = pygame.time.Clock()
+    running = True
 
-    # IMPORTS
-    star_surf = pygame.image.load(join('images', 'star.png')).convert_alpha()
-    meteor_surf = pygame.image.load(
-        join('images', 'meteor.png')).convert_alpha()
-    laser_surf = pygame.image.load(join('images', 'laser.png')).convert_alpha()
-    font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 20)
-    explosion_frames = [pygame.image.load(
-        join('images', 'explosion', f'{i}.png')).convert_alpha() for i in range(21)]
-
-    laser_sound = pygame.mixer.Sound(join('audio', 'laser.wav'))
-    laser_sound.set_volume(0.2)
-    explosion_sound = pygame.mixer.Sound(join('audio', 'explosion.wav'))
-    explosion_sound.set_volume(0.2)
-    damage_sound = pygame.mixer.Sound(join('audio', 'damage.ogg'))
-    game_music = pygame.mixer.Sound(join('audio', 'game_music.wav'))
-    game_music.set_volume(0.08)
-    game_music.play(loops=-1)
+    # IMPORTS: decoded in the background behind a loading screen
+    loader = AssetLoader()
+    request_assets(loader)
+    while running and not loader.done(*CRITICAL_ASSETS):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        draw_loading_screen(loader.progress(CRITICAL_ASSETS))
+        clock.tick(FPS_CAP)
+    if not running:
+        loader.close()
+        pygame.quit()
+        return 0
+
+    player_surf = loader.get('player.png').convert_alpha()
+    star_surf = loader.get('star.png').convert_alpha()
+    meteor_surf = loader.get('meteor.png').convert_alpha()
+    laser_surf = loader.get('laser.png').convert_alpha()
+    font = loader.get('font')
+    score_hud = ScoreHud(font)
+    explosion_frames = None  # until the loader has them
+    sfx = SfxPool()
 
     # SPRITES
     all_sprites = pygame.sprite.Group()
     meteor_sprites = pygame.sprite.Group()
     laser_sprites = pygame.sprite.Group()
 
-    for i in range(20):
-        Star(all_sprites, star_surf)
+    # Static starfield, drawn once into the background; each frame only
+    # restores and updates the areas the sprites and the HUD touch
+    stars = [pygame.Rect(randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT),
+                         0, 0) for _ in range(20)]
+    renderer = DirtyRenderer(display_surface, bake_starfield(
+        (WINDOW_WIDTH, WINDOW_HEIGHT), star_surf, stars))
 
     player = Player(all_sprites)
 
-    # custom events -> meteor event
-    meteor_event = pygame.event.custom_type()
-    pygame.time.set_timer(meteor_event, 500)
+    sim_ticks = 0.0
+    meteor_timer = 0.0
+    loop = fixed_step.FixedStepLoop(SIM_DT, FPS_CAP)
 
-    running = True
     while running:
-        dt = clock.tick() / 1000
+        # sleeps until the next frame is due
+        steps = loop.frame()
         # Event loop
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == meteor_event:
-                x, y = randint(0, WINDOW_WIDTH), randint(-200, -100)
-                Meteor(meteor_surf, (x, y), (all_sprites, meteor_sprites))
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                player.shoot_requested = True
 
-        # update
-        all_sprites.update(dt)
-
-        if collisions():
-            running = False
+        # update, in fixed steps
+        for _ in range(steps):
+            if simulate(SIM_DT):
+                running = False
+                break
 
         # Draw the game
-        display_surface.fill('#04010f')
-        all_sprites.draw(display_surface)
-
-        score = display_score()
-
-        pygame.display.update()
-
+        renderer.begin()
+        renderer.draw(all_sprites, loop.alpha)
+        score, hud_rect = display_score()
+        renderer.mark(hud_rect)
+        renderer.present()
+
+        if start_time is not None:
+            print("First interactive frame after "
+                  f"{1000 * (time.perf_counter() - start_time):.0f} ms")
+            start_time = None
+            start_music()
+        pick_up_deferred_assets()
+
+    loader.close()
     pygame.quit()
     return score
 
@@ -0,0 +1,63 @@
+import math
+
+import pygame
+
+# Narrowphase com rejeição barata: antes do teste pixel a pixel das máscaras,
+# descarta pares cujos círculos envolventes ou rects não se tocam. As
+# rejeições têm folga para o arredondamento do offset inteiro usado por
+# collide_mask, então o resultado é o mesmo de pygame.sprite.collide_mask.
+
+SLACK = 2  # px
+
+_radius = {}
+
+
+def mask_radius(mask):
+    # Raio do círculo centrado na máscara que cobre todos os pixels opacos
+    radius = _radius.get(mask)
+    if radius is None:
+        w, h = mask.get_size()
+        cx, cy = w / 2, h / 2
+        radius = 0.0
+        for x, y in mask.outline():
+            radius = max(radius, math.hypot(x + 0.5 - cx, y + 0.5 - cy))
+        radius += 1
+        _radius[mask] = radius
+    return radius
+
+
+def collide_mask_fast(left, right):
+    lrect, rrect = left.rect, right.rect
+    reach = mask_radius(left.mask) + mask_radius(right.mask) + SLACK
+    dx = lrect.centerx - rrect.centerx
+    dy = lrect.centery - rrect.centery
+    if dx * dx + dy * dy > reach * reach:
+        return False
+    if not lrect.inflate(SLACK, SLACK).colliderect(rrect):
+        return False
+    return pygame.sprite.collide_mask(left, right)
+
+
+class PixelHits:
+    # Colisão por pixel player x meteoro para o BatchSpaceShooter, que só tem
+    # centros e ângulos: a máscara do player é comparada com a rotação do
+    # meteoro (rotation_cache) no offset entre os centros, como um
+    # collide_mask entre os sprites desenhados na tela
+    def __init__(self, player_mask, rotations):
+        self.player_mask = player_mask
+        self.rotations = rotations
+        w, h = player_mask.get_size()
+        self.half_w, self.half_h = w / 2, h / 2
+        # Pares mais distantes que isso nem chegam ao teste por pixel
+        meteor_radius = max(
+            mask_radius(rotations.get(i * rotations.step)[1])
+            for i in range(rotations.num_frames))
+        self.reach = mask_radius(player_mask) + meteor_radius + SLACK
+
+    def __call__(self, dx, dy, angle):
+        # dx, dy: centro do meteoro menos centro do player
+        mask = self.rotations.get(angle)[1]
+        w, h = mask.get_size()
+        offset = (round(dx + self.half_w - w / 2),
+                  round(dy + self.half_h - h / 2))
+        return self.player_mask.overlap(mask, offset) is not None
@@ -0,0 +1,59 @@
+import pygame
+
+import fixed_step
+
+# Renderização por retângulos sujos: o fundo (cor + estrelas) é desenhado uma
+# vez numa surface; a cada quadro só as áreas ocupadas pelos sprites no
+# quadro anterior e no atual são restauradas/desenhadas e enviadas ao
+# display.update, em vez de limpar e atualizar a tela inteira.
+
+BACKGROUND_COLOR = '#04010f'
+
+
+def bake_starfield(size, star_surf, stars, color=BACKGROUND_COLOR):
+    # stars: sprites ou retângulos com as posições das estrelas
+    background = pygame.Surface(size).convert()
+    background.fill(color)
+    for star in stars:
+        rect = getattr(star, 'rect', star)
+        background.blit(star_surf, star_surf.get_rect(center=rect.center))
+    return background
+
+
+class DirtyRenderer:
+    def __init__(self, surface, background=None):
+        self.surface = surface
+        self.background = background
+        self.previous = []  # áreas desenhadas no quadro anterior
+        self.current = []
+        self.full = True  # próximo present() atualiza a tela inteira
+
+    def set_background(self, background):
+        self.background = background
+        self.previous = []
+        self.full = True
+
+    def begin(self):
+        # Apaga o quadro anterior: fundo inteiro ou só onde havia sprites
+        if self.full:
+            self.surface.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                self.surface.blit(self.background, rect, rect)
+        self.current = []
+
+    def draw(self, sprites, alpha=1.0):
+        self.current.extend(
+            fixed_step.draw_interpolated(self.surface, sprites, alpha))
+
+    def mark(self, rect):
+        # Algo desenhado fora de draw() (HUD, círculo de debug...)
+        self.current.append(rect)
+
+    def present(self):
+        if self.full:
+            pygame.display.update()
+            self.full = False
+        else:
+            pygame.display.update(self.previous + self.current)
+        self.previous = self.current
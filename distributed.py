@@ -0,0 +1,273 @@
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+
+from evaluation import CommonSeedEvaluator
+import profiling
+
+# Avaliação distribuída: o coordenador (DistributedEvaluator, dentro do
+# run_neat) publica lotes de genomas num WorkBoard servido por TCP, e workers
+# em qualquer máquina pegam lotes, jogam e devolvem as fitness. Cada lote
+# pego tem um prazo (lease), renovado pelo worker a cada genoma jogado; se o
+# worker sumir, o lote volta para a fila e outro worker o assume. Um lote que
+# falha (exceção na avaliação ou lease vencido) `max_attempts` vezes
+# derruba a avaliação em vez de ficar circulando. Workers podem entrar e
+# sair no meio da geração.
+#
+# O multiprocessing.managers troca pickles, e unpickle executa código: a
+# chave (authkey) é o que impede um estranho de mandar tarefas para os
+# workers ou resultados para o coordenador. Ela não tem valor padrão e vem
+# da variável de ambiente SPACE_SHOOTER_AUTHKEY, a mesma em todas as
+# máquinas. O coordenador escuta só em localhost, a menos que outro host
+# seja pedido.
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 50000
+AUTHKEY_ENV = 'SPACE_SHOOTER_AUTHKEY'
+POLL_INTERVAL = 0.5  # s, espera do worker quando a fila está vazia
+DEFAULT_LEASE = 120.0  # s por genoma: o worker renova a cada genoma jogado
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class WorkBoard:
+    def __init__(self, lease, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.lock = threading.Condition()
+        self.queue = deque()  # batch_ids esperando um worker
+        self.tasks = {}  # batch_id -> tarefa ainda sem resultado
+        self.leases = {}  # batch_id -> (worker, prazo)
+        self.results = {}
+        self.failures = {}  # batch_id -> tentativas que falharam
+        self.errors = {}  # batch_id -> erro da última tentativa, se desistiu
+        self.workers = {}  # worker -> último contato
+
+    def post(self, tasks):
+        with self.lock:
+            for batch_id, task in tasks:
+                self.tasks[batch_id] = task
+                self.queue.append(batch_id)
+
+    def take(self, worker):
+        # Próximo lote para o worker, ou None se não houver trabalho
+        with self.lock:
+            now = time.monotonic()
+            self.workers[worker] = now
+            self._requeue_expired(now)
+            while self.queue:
+                batch_id = self.queue.popleft()
+                if batch_id in self.tasks:  # pode ter sido entregue por outro
+                    self.leases[batch_id] = (worker, now + self.lease)
+                    return batch_id, self.tasks[batch_id]
+            return None
+
+    def renew(self, worker, batch_id):
+        # Estende o lease; False se o lote já não é mais deste worker
+        with self.lock:
+            now = time.monotonic()
+            self.workers[worker] = now
+            lease = self.leases.get(batch_id)
+            if lease is None or lease[0] != worker:
+                return False
+            self.leases[batch_id] = (worker, now + self.lease)
+            return True
+
+    def fail(self, worker, batch_id, error):
+        # A avaliação do lote levantou uma exceção no worker
+        with self.lock:
+            self.workers[worker] = time.monotonic()
+            lease = self.leases.get(batch_id)
+            if lease is not None and lease[0] == worker:
+                del self.leases[batch_id]
+                self._retry(batch_id, error)
+
+    def submit(self, worker, batch_id, fitnesses):
+        with self.lock:
+            self.workers[worker] = time.monotonic()
+            self.leases.pop(batch_id, None)
+            self.failures.pop(batch_id, None)
+            # Resultado atrasado de um lote já reentregue é descartado
+            if self.tasks.pop(batch_id, None) is not None:
+                self.results[batch_id] = fitnesses
+                self.lock.notify_all()
+
+    def leave(self, worker):
+        # Saída limpa: os lotes do worker voltam para a fila na hora
+        with self.lock:
+            self.workers.pop(worker, None)
+            for batch_id, (owner, _) in list(self.leases.items()):
+                if owner == worker:
+                    del self.leases[batch_id]
+                    self.queue.appendleft(batch_id)
+
+    def collect(self, batch_ids):
+        # Bloqueia o coordenador até todos os lotes terem resultado; levanta
+        # RuntimeError se algum lote esgotou as tentativas
+        with self.lock:
+            while any(batch_id not in self.results for batch_id in batch_ids):
+                for batch_id in batch_ids:
+                    if batch_id in self.errors:
+                        raise RuntimeError(
+                            f"Lote {batch_id} falhou "
+                            f"{self.failures[batch_id]} vezes; último erro:\n"
+                            f"{self.errors.pop(batch_id)}")
+                self.lock.wait(POLL_INTERVAL)
+                self._requeue_expired(time.monotonic())
+            return [self.results.pop(batch_id) for batch_id in batch_ids]
+
+    def active_workers(self, within=60.0):
+        with self.lock:
+            now = time.monotonic()
+            return sum(now - seen < within for seen in self.workers.values())
+
+    def _requeue_expired(self, now):
+        for batch_id, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[batch_id]
+                self._retry(batch_id, f"lease de {self.lease:.0f} s vencido "
+                                      f"com o worker {worker}")
+
+    def _retry(self, batch_id, error):
+        # Volta o lote para a fila, ou desiste dele depois de max_attempts
+        self.failures[batch_id] = self.failures.get(batch_id, 0) + 1
+        if self.failures[batch_id] < self.max_attempts:
+            self.queue.appendleft(batch_id)
+            return
+        self.tasks.pop(batch_id, None)
+        self.errors[batch_id] = error
+        self.lock.notify_all()
+
+
+class _BoardManager(BaseManager):
+    pass
+
+
+class DistributedEvaluator(CommonSeedEvaluator):
+    def __init__(self, eval_function, episodes, authkey,
+                 address=(DEFAULT_HOST, DEFAULT_PORT), batch_size=4,
+                 lease=DEFAULT_LEASE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, seed=None, reseed_every=1,
+                 cache=None, verbose=True):
+        # eval_function(genome, config, seeds) -> fitness; precisa ser
+        # importável nos workers (função de módulo, não lambda)
+        if not authkey:
+            raise ValueError("authkey vazia: o coordenador aceitaria "
+                             "qualquer conexão")
+        super().__init__(0, eval_function, episodes, seed=seed,
+                         reseed_every=reseed_every, cache=cache)
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.board = WorkBoard(lease, max_attempts)
+        self.next_batch = 0
+
+        board = self.board
+        _BoardManager.register('get_board', callable=lambda: board)
+        self.server = _BoardManager(address=address,
+                                    authkey=authkey).get_server()
+        self.address = self.server.address  # porta real se a pedida for 0
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def close(self):
+        super().close()
+        server = getattr(self, 'server', None)
+        if server is not None and hasattr(server, 'stop_event'):
+            server.stop_event.set()
+        self.server = None
+
+    def run_jobs(self, genomes, config, seeds):
+        start = time.perf_counter()
+        func = self.job_function()
+        tasks = []
+        for i in range(0, len(genomes), self.batch_size):
+            task = (func, config, seeds, genomes[i:i + self.batch_size])
+            tasks.append((self.next_batch, task))
+            self.next_batch += 1
+        self.board.post(tasks)
+        results = self.board.collect([batch_id for batch_id, _ in tasks])
+        results = [f for batch in results for f in batch]
+        workers = self.board.active_workers()
+        wall = time.perf_counter() - start
+        if profiling.ENABLED:
+            results = profiling.unwrap(results, wall, workers)
+        if self.verbose:
+            print(f"Distribuído: {len(genomes)} genomas em {len(tasks)} "
+                  f"lotes, {workers} workers, {wall:.1f} s")
+        return results
+
+
+def parse_address(text):
+    # "host:porta", "host", "porta" ou "" -> (host, porta)
+    if text.isdigit():
+        return DEFAULT_HOST, int(text)
+    host, _, port = text.partition(':')
+    return host or DEFAULT_HOST, int(port or DEFAULT_PORT)
+
+
+def require_authkey():
+    # Chave de SPACE_SHOOTER_AUTHKEY; sem ela coordenador e workers não sobem
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        sys.exit(f"Defina {AUTHKEY_ENV} com uma chave secreta, a mesma no "
+                 "coordenador e em todos os workers")
+    return key.encode()
+
+
+def connect(address, authkey, retry=POLL_INTERVAL):
+    # Espera o coordenador subir, se o worker começar antes
+    _BoardManager.register('get_board')
+    while True:
+        manager = _BoardManager(address=address, authkey=authkey)
+        try:
+            manager.connect()
+            return manager.get_board()
+        except ConnectionError:
+            time.sleep(retry)
+
+
+def work(address, authkey, name=None):
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    board = connect(address, authkey)
+    try:
+        while True:
+            try:
+                job = board.take(name)
+            except (EOFError, ConnectionError):
+                break  # coordenador terminou
+            if job is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            batch_id, (eval_function, config, seeds, genomes) = job
+            try:
+                fitnesses = []
+                for genome in genomes:
+                    fitnesses.append(eval_function(genome, config, seeds))
+                    # Lote reentregue a outro worker: não adianta continuar
+                    if not board.renew(name, batch_id):
+                        break
+                else:
+                    board.submit(name, batch_id, fitnesses)
+            except (EOFError, ConnectionError):
+                break
+            except Exception:
+                # O worker segue vivo; o coordenador decide se tenta de novo
+                board.fail(name, batch_id, traceback.format_exc())
+    except KeyboardInterrupt:
+        board.leave(name)
+
+
+def run_worker(address, authkey, processes=None):
+    # Um processo por núcleo, cada um pegando seus próprios lotes
+    processes = processes or os.cpu_count()
+    workers = [Process(target=work, args=(address, authkey))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
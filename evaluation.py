@@ -0,0 +1,199 @@
+import random
+import time
+from multiprocessing import Pool
+
+from fitness_cache import genome_key
+import profiling
+
+# Avaliadores de população para o neat (mesma interface de
+# ParallelEvaluator.evaluate). Com common random numbers todos os genomas de
+# uma geração jogam os mesmos episódios (mesmas seeds), então a diferença de
+# fitness vem da rede e não da sorte do campo de meteoros. Com um
+# FitnessCache, genomas cuja rede expressa já foi avaliada nas mesmas seeds
+# (elites, genomas que só diferem em genes desabilitados) não são simulados.
+# As estatísticas do cache saem no ProfileReporter e no fim do treino.
+# Cada genoma guarda em eval_seeds as seeds que jogou, para o replay.
+
+
+class CommonSeedEvaluator:
+    def __init__(self, num_workers, eval_function, episodes, seed=None,
+                 reseed_every=1, timeout=None, cache=None):
+        # eval_function(genome, config, seeds) -> fitness
+        self.num_workers = num_workers
+        self.eval_function = eval_function
+        self.episodes = episodes
+        self.reseed_every = reseed_every
+        self.timeout = timeout
+        self.cache = cache
+        self.rng = random.Random(seed)
+        self.generation = 0
+        self.seeds = None
+        # num_workers=0: sem pool local (subclasses que avaliam em outro lugar)
+        self.pool = Pool(num_workers) if num_workers > 0 else None
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def next_seeds(self):
+        # Um conjunto de seeds por geração (ou a cada `reseed_every`)
+        if self.seeds is None or self.generation % self.reseed_every == 0:
+            self.seeds = [self.rng.randrange(2 ** 31)
+                          for _ in range(self.episodes)]
+        self.generation += 1
+        return self.seeds
+
+    def seed_state(self):
+        # Para checkpoints: o resume continua a mesma sequência de seeds
+        return self.rng.getstate(), self.seeds, self.generation
+
+    def restore_seed_state(self, state):
+        rng_state, self.seeds, self.generation = state
+        self.rng.setstate(rng_state)
+
+    def evaluate(self, genomes, config):
+        seeds = self.next_seeds()
+        for ignored_genome_id, genome in genomes:
+            genome.eval_seeds = tuple(seeds)
+        if self.cache is None:
+            results = self.run_jobs([genome for _, genome in genomes],
+                                    config, seeds)
+            for (ignored_genome_id, genome), f in zip(genomes, results):
+                genome.fitness = f
+            return
+
+        # Uma simulação por chave: acertos e duplicatas da geração reusam
+        keys = [(genome_key(genome, config), tuple(seeds))
+                for ignored_genome_id, genome in genomes]
+        fitness = {}
+        pending = {}
+        for key, (ignored_genome_id, genome) in zip(keys, genomes):
+            if key in fitness or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                fitness[key] = cached
+            else:
+                pending[key] = genome
+        results = self.run_jobs(list(pending.values()), config, seeds)
+        for key, f in zip(pending, results):
+            fitness[key] = f
+            self.cache.put(key, f)
+        for key, (ignored_genome_id, genome) in zip(keys, genomes):
+            genome.fitness = fitness[key]
+
+    def job_function(self):
+        # Com profiling, os workers devolvem também os tempos de cada job
+        if profiling.ENABLED:
+            return profiling.Collected(self.eval_function)
+        return self.eval_function
+
+    def run_jobs(self, genomes, config, seeds):
+        # Fitness de cada genoma, na mesma ordem
+        start = time.perf_counter()
+        func = self.job_function()
+        jobs = [self.pool.apply_async(func, (genome, config, seeds))
+                for genome in genomes]
+        results = [job.get(timeout=self.timeout) for job in jobs]
+        if profiling.ENABLED:
+            results = profiling.unwrap(results, time.perf_counter() - start,
+                                       self.num_workers)
+        return results
+
+
+class RacingEvaluator(CommonSeedEvaluator):
+    # Successive halving: todos jogam o primeiro episódio, e a cada rodada só
+    # a fração `schedule[r]` dos melhores (pela média até ali) joga o
+    # episódio r. Quem é cortado fica com uma estimativa conservadora: a
+    # própria média, limitada à pior fitness final de quem seguiu na corrida.
+    def __init__(self, num_workers, episode_function, schedule=(1.0, 0.5, 0.25),
+                 seed=None, reseed_every=1, timeout=None, verbose=True,
+                 cache=None):
+        # episode_function(genome, config, seeds) -> [fitness por episódio]
+        # O cache, se houver, guarda a fitness de cada (rede, seed)
+        super().__init__(num_workers, episode_function, len(schedule),
+                         seed=seed, reseed_every=reseed_every,
+                         timeout=timeout, cache=cache)
+        self.schedule = schedule
+        self.verbose = verbose
+        self.episodes_run = 0
+        self.episodes_full = 0
+
+    def evaluate(self, genomes, config):
+        start = time.perf_counter()
+        seeds = self.next_seeds()
+        scores = {genome_id: [] for genome_id, _ in genomes}
+        by_id = dict(genomes)
+        racing = list(by_id)
+        cuts = []  # (ids cortados, ids que seguiram) em cada rodada
+        net_keys = None
+        if self.cache is not None:
+            net_keys = {gid: genome_key(genome, config)
+                        for gid, genome in genomes}
+        run = 0
+
+        for r, fraction in enumerate(self.schedule):
+            if r > 0:
+                keep = max(1, round(len(genomes) * fraction))
+                racing.sort(key=lambda gid: _mean(scores[gid]), reverse=True)
+                cuts.append((racing[keep:], racing[:keep]))
+                racing = racing[:keep]
+            run += self._run_round(racing, by_id, config, seeds[r], scores,
+                                   net_keys)
+
+        fitness = {gid: _mean(s) for gid, s in scores.items()}
+        # Da última rodada para a primeira: o limite de cada corte já
+        # considera as estimativas dos cortes seguintes
+        for dropped, kept in reversed(cuts):
+            floor = min(fitness[gid] for gid in kept)
+            for gid in dropped:
+                fitness[gid] = min(fitness[gid], floor)
+        for gid, genome in genomes:
+            genome.fitness = fitness[gid]
+            genome.eval_seeds = tuple(seeds[:len(scores[gid])])
+
+        full = len(genomes) * len(self.schedule)
+        self.episodes_run += run
+        self.episodes_full += full
+        if self.verbose:
+            print(f"Racing: {run}/{full} episódios "
+                  f"({100 * (1 - run / full):.0f}% economizados) em "
+                  f"{time.perf_counter() - start:.1f} s")
+
+    def _run_round(self, racing, by_id, config, seed, scores, net_keys):
+        # Joga o episódio `seed` para os genomas em `racing`; devolve quantos
+        # episódios foram de fato simulados
+        if net_keys is None:
+            fitnesses = self.run_jobs([by_id[gid] for gid in racing], config,
+                                      [seed])
+            for gid, episode_fitness in zip(racing, fitnesses):
+                scores[gid].extend(episode_fitness)
+            return len(racing)
+
+        results = {}
+        pending = {}
+        for gid in racing:
+            key = (net_keys[gid], seed)
+            if key in results or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = by_id[gid]
+        fitnesses = self.run_jobs(list(pending.values()), config, [seed])
+        for key, episode_fitness in zip(pending, fitnesses):
+            results[key] = episode_fitness[0]
+            self.cache.put(key, results[key])
+        for gid in racing:
+            scores[gid].append(results[(net_keys[gid], seed)])
+        return len(pending)
+
+
+def _mean(values):
+    return sum(values) / len(values)
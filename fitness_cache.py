@@ -0,0 +1,94 @@
+import hashlib
+from collections import OrderedDict
+
+from neat.graphs import feed_forward_layers
+
+# Cache de fitness por rede expressa: genomas que só diferem em genes
+# desabilitados, em nós que não chegam às saídas ou nos ids dos nós ocultos
+# (redes isomorfas) geram a mesma chave. Com a mesma seed de avaliação, a fitness é
+# a mesma e a simulação pode ser pulada (elites copiados pelo
+# DefaultReproduction, por exemplo).
+
+DEFAULT_MAXSIZE = 4096
+
+
+def genome_key(genome, config):
+    genome_config = config.genome_config
+    input_keys = genome_config.input_keys
+    output_keys = genome_config.output_keys
+
+    connections = [cg.key for cg in genome.connections.values()
+                   if cg.enabled]
+    layers = feed_forward_layers(input_keys, output_keys, connections)
+    incoming = {}
+    for i, o in connections:
+        incoming.setdefault(o, []).append((i, genome.connections[i, o].weight))
+
+    # Entradas e saídas mantêm a chave. Um oculto é rotulado pelo que ele
+    # calcula (atributos + entradas já rotuladas, camada a camada), nunca
+    # pelo id: ocultos com o mesmo rótulo têm o mesmo valor, então a chave
+    # não depende da numeração
+    labels = {key: ('i', key) for key in input_keys}
+    nodes = []
+    for layer in layers:
+        for node in layer:
+            ng = genome.nodes[node]
+            attributes = (ng.bias, ng.response, ng.activation, ng.aggregation)
+            if node in output_keys:
+                labels[node] = ('o', node)
+            else:
+                signature = (attributes, sorted(
+                    (labels[i], w) for i, w in incoming.get(node, ())))
+                labels[node] = ('h', hashlib.blake2b(
+                    repr(signature).encode(), digest_size=8).hexdigest())
+            nodes.append((labels[node],) + attributes)
+    nodes.sort()
+
+    edges = sorted((labels[i], labels[o], genome.connections[i, o].weight)
+                   for i, o in connections if i in labels and o in labels)
+    # Saídas fora das camadas valem 0.0 na rede, então entram só pela chave
+    unreached = [key for key in output_keys if key not in labels]
+    expressed = repr((nodes, edges, unreached)).encode()
+    return hashlib.blake2b(expressed, digest_size=16).hexdigest()
+
+
+class FitnessCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        # Devolve None quando a chave não está no cache
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)  # LRU: o menos usado sai
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'entries': len(self.entries),
+                'maxsize': self.maxsize}
+
+    def report(self):
+        print(f"Cache de fitness: {100 * self.hit_rate:.1f}% de acertos "
+              f"({self.hits}/{self.hits + self.misses}), "
+              f"{len(self.entries)}/{self.maxsize} entradas")
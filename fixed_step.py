@@ -0,0 +1,52 @@
+import pygame
+
+# Loop de passo fixo para o modo play: a simulação anda sempre em step_dt
+# (o mesmo dt do treino) e a tela é desenhada na taxa do monitor, limitada a
+# fps_cap, interpolando as posições entre o passo anterior e o atual.
+
+DEFAULT_FPS_CAP = 120
+MAX_FRAME_TIME = 0.25  # s; depois de um travamento, não tenta recuperar tudo
+
+
+class FixedStepLoop:
+    def __init__(self, step_dt=1/60, fps_cap=DEFAULT_FPS_CAP):
+        self.step_dt = step_dt
+        self.fps_cap = fps_cap  # 0 = sem limite (ocupa um núcleo inteiro)
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+
+    def frame(self):
+        # Dorme até o próximo quadro e devolve quantos passos simular nele
+        frame_time = min(self.clock.tick(self.fps_cap) / 1000, MAX_FRAME_TIME)
+        self.accumulator += frame_time
+        steps = int(self.accumulator // self.step_dt)
+        self.accumulator -= steps * self.step_dt
+        return steps
+
+    @property
+    def alpha(self):
+        # Fração do próximo passo já decorrida, para a interpolação
+        return self.accumulator / self.step_dt
+
+
+def remember_positions(sprites):
+    # Chamado antes de cada passo: guarda de onde cada sprite sai
+    for sprite in sprites:
+        sprite.previous_center = sprite.rect.center
+
+
+def draw_interpolated(surface, sprites, alpha):
+    # Devolve as áreas desenhadas (para o dirty_render)
+    rects = []
+    for sprite in sprites:
+        previous = getattr(sprite, 'previous_center', None)
+        if previous is None or alpha >= 1.0:
+            rects.append(surface.blit(sprite.image, sprite.rect))
+            continue
+        x, y = sprite.rect.center
+        px, py = previous
+        width, height = sprite.image.get_size()
+        rects.append(surface.blit(sprite.image,
+                                  (px + (x - px) * alpha - width / 2,
+                                   py + (y - py) * alpha - height / 2)))
+    return rects
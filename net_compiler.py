@@ -0,0 +1,243 @@
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+import profiling
+
+# Compila um DefaultGenome em camadas densas (matriz de pesos + bias) e
+# avalia cada camada com numpy. Mesmo resultado do
+# neat.nn.FeedForwardNetwork, sem o laço Python por conexão.
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _relu(z):
+    return np.maximum(z, 0.0)
+
+
+def _identity(z):
+    return z
+
+
+def _clamped(z):
+    return np.clip(z, -1.0, 1.0)
+
+
+def _abs(z):
+    return np.abs(z)
+
+
+NUMPY_ACTIVATIONS = {
+    'sigmoid': _sigmoid,
+    'tanh': _tanh,
+    'relu': _relu,
+    'identity': _identity,
+    'clamped': _clamped,
+    'abs': _abs,
+}
+
+
+_fallbacks = {}
+
+
+def activation_function(name, genome_config):
+    func = NUMPY_ACTIVATIONS.get(name)
+    if func is None:
+        # Ativações sem versão numpy usam a função do neat elemento a elemento
+        scalar = genome_config.activation_defs.get(name)
+        func = _fallbacks.get(scalar)
+        if func is None:
+            vectorized = np.frompyfunc(scalar, 1, 1)
+
+            def func(z):
+                return vectorized(z).astype(float)
+            _fallbacks[scalar] = func
+    return func
+
+
+class CompiledNetwork:
+    def __init__(self, num_inputs, layers, output_index):
+        self.num_inputs = num_inputs
+        # layers: lista de (início, fim, pesos, bias, [(ativação, idx)]);
+        # o response de cada nó já vem multiplicado nos pesos
+        self.layers = layers
+        self.output_index = output_index
+        size = num_inputs + sum(len(layer[3]) for layer in layers) + 1
+        self.values = np.zeros(size)
+
+    @profiling.timed('net.activate')
+    def activate(self, inputs):
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError(
+                f"Expected {self.num_inputs:n} inputs, got {len(inputs):n}")
+        values = self.values
+        values[:self.num_inputs] = inputs
+        for start, end, weights, bias, groups in self.layers:
+            z = weights @ values[:start]
+            z += bias
+            out = values[start:end]
+            if groups is None:
+                # Camada só com relu, o caso da nossa config
+                np.maximum(z, 0.0, out=out)
+            else:
+                for func, idx in groups:
+                    out[idx] = func(z[idx])
+        return values[self.output_index]
+
+    @staticmethod
+    def compile_layers(genome, config):
+        genome_config = config.genome_config
+        input_keys = genome_config.input_keys
+        output_keys = genome_config.output_keys
+
+        connections = [cg.key for cg in genome.connections.values()
+                       if cg.enabled]
+        node_layers = feed_forward_layers(input_keys, output_keys,
+                                          connections)
+
+        incoming = {}
+        for key in connections:
+            incoming.setdefault(key[1], []).append(key)
+
+        index = {key: i for i, key in enumerate(input_keys)}
+        offset = len(input_keys)
+        layers = []
+        for layer in node_layers:
+            nodes = sorted(layer)
+            weights = np.zeros((len(nodes), offset))
+            bias = np.empty(len(nodes))
+            by_activation = {}
+            for row, node in enumerate(nodes):
+                ng = genome.nodes[node]
+                if ng.aggregation != 'sum':
+                    raise ValueError(
+                        f"Agregação não suportada: {ng.aggregation!r}")
+                for key in incoming.get(node, ()):
+                    weights[row, index[key[0]]] += genome.connections[key].weight
+                weights[row] *= ng.response
+                bias[row] = ng.bias
+                by_activation.setdefault(ng.activation, []).append(row)
+            if list(by_activation) == ['relu']:
+                groups = None
+            else:
+                groups = [(activation_function(name, genome_config),
+                           np.array(rows))
+                          for name, rows in by_activation.items()]
+            end = offset + len(nodes)
+            layers.append((offset, end, weights, bias, groups))
+            for row, node in enumerate(nodes):
+                index[node] = offset + row
+            offset = end
+
+        # Saídas fora das camadas ficam em 0.0, como no FeedForwardNetwork;
+        # todas apontam para o slot extra no fim de `values`
+        output_index = np.array([index.get(key, offset)
+                                 for key in output_keys])
+        return len(input_keys), layers, output_index
+
+    @staticmethod
+    def create(genome, config):
+        return CompiledNetwork(*CompiledNetwork.compile_layers(genome, config))
+
+
+class BatchedNetworks:
+    def __init__(self, networks):
+        # Empacota as redes de toda a população num layout comum: cada
+        # profundidade d ocupa as colunas [base_d, base_d + largura_d) de
+        # uma matriz de valores (N, S), com zeros onde a rede é mais estreita
+        n = len(networks)
+        num_inputs = networks[0][0]
+        depth = max(len(layers) for _, layers, _ in networks)
+        widths = [0] * depth
+        for _, layers, _ in networks:
+            for d, layer in enumerate(layers):
+                widths[d] = max(widths[d], len(layer[3]))
+
+        bases = [num_inputs]
+        for w in widths:
+            bases.append(bases[-1] + w)
+        self.size = bases[-1] + 1  # último slot é sempre zero
+        self.num_inputs = num_inputs
+
+        self.weights = [np.zeros((n, w, bases[d]))
+                        for d, w in enumerate(widths)]
+        self.bias = [np.zeros((n, w)) for w in widths]
+        # máscaras (N, largura) por função de ativação, por profundidade
+        self.activations = [{} for _ in widths]
+        num_outputs = len(networks[0][2])
+        self.output_index = np.full((n, num_outputs), self.size - 1)
+
+        for i, (_, layers, output_index) in enumerate(networks):
+            # Posição de cada valor da rede compacta no layout comum
+            slot = np.arange(num_inputs + sum(len(l[3]) for l in layers) + 1)
+            slot[-1] = self.size - 1
+            for d, (start, end, _, _, _) in enumerate(layers):
+                slot[start:end] = bases[d] + np.arange(end - start)
+            for d, (start, end, weights, bias, groups) in enumerate(layers):
+                width = end - start
+                self.weights[d][i][:width, slot[:start]] = weights
+                self.bias[d][i, :width] = bias
+                if groups is None:
+                    groups = [(_relu, np.arange(width))]
+                for func, idx in groups:
+                    mask = self.activations[d].setdefault(
+                        func, np.zeros((n, widths[d]), dtype=bool))
+                    mask[i, idx] = True
+            self.output_index[i] = slot[output_index]
+
+        self._rows = None
+        self._packed = None
+
+    def _pack(self, rows):
+        # Subconjunto das redes vivas; só é refeito quando alguém morre
+        if self._rows is None or not np.array_equal(self._rows, rows):
+            self._rows = rows
+            self._packed = (
+                [w[rows] for w in self.weights],
+                [b[rows] for b in self.bias],
+                [{f: m[rows] for f, m in acts.items()}
+                 for acts in self.activations],
+                self.output_index[rows])
+        return self._packed
+
+    @profiling.timed('nets.activate')
+    def activate(self, inputs, alive=None):
+        inputs = np.asarray(inputs, dtype=float)
+        n = len(inputs)
+        if alive is None or alive.all():
+            rows = slice(None)
+            weights, biases = self.weights, self.bias
+            activations, output_index = self.activations, self.output_index
+        else:
+            rows = np.flatnonzero(alive)
+            weights, biases, activations, output_index = self._pack(rows)
+
+        values = np.zeros((len(output_index), self.size))
+        values[:, :self.num_inputs] = inputs[rows]
+        start = self.num_inputs
+        for w, b, acts in zip(weights, biases, activations):
+            z = np.matmul(w, values[:, :start, None])[..., 0]
+            z += b
+            end = start + w.shape[1]
+            out = values[:, start:end]
+            for func, mask in acts.items():
+                if func in _fallbacks.values():
+                    # Função Python: avalia só onde ela é usada
+                    out[mask] = func(z[mask])
+                else:
+                    np.copyto(out, func(z), where=mask)
+            start = end
+
+        outputs = np.zeros((n, output_index.shape[1]))
+        outputs[rows] = np.take_along_axis(values, output_index, axis=1)
+        return outputs
+
+    @staticmethod
+    def create(genomes, config):
+        return BatchedNetworks([CompiledNetwork.compile_layers(g, config)
+                                for g in genomes])
@@ -1,29 +1,49 @@
-from neat.parallel import ParallelEvaluator
 import pygame
-from os.path import join
-from random import randint, uniform, seed as pyseed
 import random
 import pickle
 import neat
 import os
 import sys
-import math
-
-if len(sys.argv) == 2 and sys.argv[1] == "train":
+import time
+
+import numpy as np
+
+import assets
+import checkpoint
+from collision import collide_mask_fast
+from dirty_render import DirtyRenderer, bake_starfield
+import distributed
+from evaluation import CommonSeedEvaluator, RacingEvaluator
+from fitness_cache import FitnessCache
+import fixed_step
+from net_compiler import CompiledNetwork
+import profiling
+import rotation_cache
+import sensors
+from sprite_pool import PooledSprite, SpritePool, pool_stats, record_churn
+
+if "--profile" in sys.argv:
+    sys.argv.remove("--profile")  # profiling.ENABLED já leu a flag
+if len(sys.argv) >= 2 and sys.argv[1] in ("train", "race", "serve", "worker",
+                                          "resume"):
     os.environ["SDL_VIDEODRIVER"] = "dummy"
 
 pygame.init()
 pygame.display.set_mode((1, 1))  # Cria contexto de vídeo oculto
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+ROTATION_STEP = 2  # graus, quantização das rotações dos meteoros
+FPS_CAP = 120  # quadros/s na tela no modo play; a simulação segue em 1/60
+SCREEN_RECT = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
 
 
 class Player(pygame.sprite.Sprite):
 
-    def __init__(self, groups, laser_surf, laser_group, all_sprites):
+    def __init__(self, groups, laser_surf, laser_group, all_sprites,
+                 laser_pool):
         super().__init__(groups)
-        self.image = pygame.image.load(
-            join('images', 'player.png')).convert_alpha()
+        self.image = assets.image('player.png')
+        self.mask = assets.mask('player.png')
         self.rect = self.image.get_frect(
             center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
         self.direction = pygame.math.Vector2()
@@ -35,16 +55,24 @@ class Player(pygame.sprite.Sprite):
         self.laser_surf = laser_surf
         self.laser_group = laser_group
         self.all_sprites = all_sprites
+        self.laser_pool = laser_pool
+
+    def reset(self):
+        self.rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+        self.direction.update(0, 0)
+        self.can_shoot = True
+        self.laser_cooldown = 0.0
 
     def external_update(self, action, dt):
-        self.direction.x = action[0]
-        self.direction.y = action[1]
+        # Vetores e rect alterados no lugar, sem objetos novos por passo
+        self.direction.update(action[0], action[1])
         if self.direction.length_squared() > 0:
-            self.direction = self.direction.normalize()
-        self.rect.center += self.direction * self.speed * dt
+            self.direction.normalize_ip()
+        self.rect.x += self.direction.x * self.speed * dt
+        self.rect.y += self.direction.y * self.speed * dt
 
         # Impede sair da tela
-        self.rect.clamp_ip(pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.rect.clamp_ip(SCREEN_RECT)
 
         # Cooldown local
         if not self.can_shoot:
@@ -53,8 +81,8 @@ class Player(pygame.sprite.Sprite):
                 self.can_shoot = True
 
         if action[2] and self.can_shoot:
-            Laser(self.laser_surf, self.rect.midtop,
-                  (self.all_sprites, self.laser_group))
+            self.laser_pool.acquire((self.all_sprites, self.laser_group),
+                                    self.laser_surf, self.rect.midtop)
             self.can_shoot = False
             self.laser_cooldown = self.cooldown_duration
 
@@ -64,16 +92,23 @@ class Star(pygame.sprite.Sprite):
     def __init__(self, groups, surf):
         super().__init__(groups)
         self.image = surf
-        self.rect = self.image.get_frect(
-            center=(randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT)))
+        self.rect = self.image.get_frect()
 
+    def place(self, rng):
+        self.rect.center = (rng.randint(0, WINDOW_WIDTH),
+                            rng.randint(0, WINDOW_HEIGHT))
 
-class Laser(pygame.sprite.Sprite):
 
-    def __init__(self, surf, pos, groups):
-        super().__init__(groups)
+class Laser(PooledSprite):
+
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
+
+    def spawn(self, surf, pos):
         self.image = surf
-        self.rect = self.image.get_frect(midbottom=pos)
+        self.rect.size = surf.get_size()
+        self.rect.midbottom = pos
 
     def update(self, dt):
         self.rect.centery -= 400 * dt
@@ -81,42 +116,54 @@ class Laser(pygame.sprite.Sprite):
             self.kill()
 
 
-class Meteor(pygame.sprite.Sprite):
+class Meteor(PooledSprite):
 
-    def __init__(self, surf, pos, groups, direction=None):
-        super().__init__(groups)
-        self.original_surf = surf
-        self.image = self.original_surf
-        self.rect = self.image.get_frect(center=pos)
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
+        self.direction = pygame.Vector2()
+
+    def spawn(self, surf, pos, rng, direction=None):
+        self.rotations = rotation_cache.get_rotation_cache(
+            'meteor', surf, ROTATION_STEP)
+        self.image, self.mask = self.rotations.get(0)
+        self.rect.size = self.image.get_size()
+        self.rect.center = pos
         self.life_time = 6.0  # segundos
         self.time_alive = 0.0
         if direction is not None:
-            self.direction = direction
+            self.direction.update(direction)
         else:
-            self.direction = pygame.Vector2(uniform(-0.5, 0.5), 1)
-        self.speed = randint(200, 250)
+            self.direction.update(rng.uniform(-0.5, 0.5), 1)
+        self.speed = rng.randint(200, 250)
         self.rotation = 0
-        self.rotation_speed = randint(40, 80)
+        self.rotation_speed = rng.randint(40, 80)
 
     def update(self, dt):
-        self.rect.center += self.direction * self.speed * dt
+        self.rect.x += self.direction.x * self.speed * dt
+        self.rect.y += self.direction.y * self.speed * dt
         self.time_alive += dt
         if self.time_alive >= self.life_time:
             self.kill()
         self.rotation += self.rotation_speed * dt
-        self.image = pygame.transform.rotozoom(
-            self.original_surf, self.rotation, 1)
-        self.rect = self.image.get_frect(center=self.rect.center)
+        self.image, self.mask = self.rotations.get(self.rotation)
+        center = self.rect.center
+        self.rect.size = self.image.get_size()
+        self.rect.center = center
 
 
-class AnimatedExplosion(pygame.sprite.Sprite):
+class AnimatedExplosion(PooledSprite):
 
-    def __init__(self, frames, pos, groups):
-        super().__init__(groups)
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
+
+    def spawn(self, frames, pos):
         self.frames = frames
         self.frame_index = 0
         self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_frect(center=pos)
+        self.rect.size = self.image.get_size()
+        self.rect.center = pos
 
     def update(self, dt):
         self.frame_index += 25 * dt
@@ -124,76 +171,117 @@ class AnimatedExplosion(pygame.sprite.Sprite):
             self.image = self.frames[int(self.frame_index)]
         else:
             self.kill()
-
 # --- Classe principal do jogo para NEAT ---
 
 
 class SpaceShooterGame:
 
-    def __init__(self, render=False):
+    def __init__(self, render=False, num_sectors=16, seed=None):
         self.render = render
+        # Gerador próprio do jogo: a mesma seed gera o mesmo campo de meteoros
+        self.rng = random.Random()
+        # Estrelas com gerador próprio: não mexem no campo de meteoros
+        self.star_rng = random.Random()
         if render:
             self.display_surface = pygame.display.set_mode(
                 (WINDOW_WIDTH, WINDOW_HEIGHT))
             pygame.display.set_caption('Space Shooter')
         else:
-            self.display_surface = pygame.Surface(
-                (WINDOW_WIDTH, WINDOW_HEIGHT))
-
-        self.running = True
-        self.score = 0
-        self.meteors_destroyed = 0
+            # Modo só simulação: nenhuma surface, estrela, fonte ou explosão
+            self.display_surface = None
 
-        # Load assets
-        self.star_surf = pygame.image.load(
-            join('images', 'star.png')).convert_alpha()
-        self.meteor_surf = pygame.image.load(
-            join('images', 'meteor.png')).convert_alpha()
-        self.laser_surf = pygame.image.load(
-            join('images', 'laser.png')).convert_alpha()
-        self.font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 20)
-        self.explosion_frames = [pygame.image.load(
-            join('images', 'explosion', f'{i}.png')).convert_alpha() for i in range(21)]
+        # Assets compartilhados (carregados uma vez por processo)
+        self.meteor_surf = assets.image('meteor.png')
+        self.laser_surf = assets.image('laser.png')
+        if render:
+            self.star_surf = assets.image('star.png')
+            self.font = assets.font('Oxanium-Bold.ttf', 20)
+            self.explosion_frames = assets.explosion_frames()
 
         # Sprite groups
         self.all_sprites = pygame.sprite.Group()
         self.meteor_sprites = pygame.sprite.Group()
         self.laser_sprites = pygame.sprite.Group()
-
-        for _ in range(20):
-            Star(self.all_sprites, self.star_surf)
+        self.explosion_sprites = pygame.sprite.Group()
+        # Meteoros, lasers e explosões destruídos voltam para estes pools
+        self.meteor_pool = SpritePool(Meteor)
+        self.laser_pool = SpritePool(Laser)
+        self.explosion_pool = SpritePool(AnimatedExplosion)
+        self.pools = {'meteor': self.meteor_pool, 'laser': self.laser_pool,
+                      'explosion': self.explosion_pool}
+
+        self.stars = []
+        if render:
+            # Fora de all_sprites: ficam pré-desenhadas no fundo
+            self.stars = [Star((), self.star_surf) for _ in range(20)]
+            self.renderer = DirtyRenderer(self.display_surface)
 
         self.player = Player(self.all_sprites, self.laser_surf,
-                             self.laser_sprites, self.all_sprites)
+                             self.laser_sprites, self.all_sprites,
+                             self.laser_pool)
+
+        # Buffer da observação: posição do player + radar + pode atirar
+        self.num_sectors = num_sectors
+        self.state = np.zeros(2 + num_sectors + 1)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Novo episódio no mesmo jogo: fica igual a um jogo recém-criado com
+        # a mesma seed, mas reaproveita sprites, grupos e buffers
+        self.rng.seed(seed)
+        self.star_rng.seed(seed)
+        for group in (self.meteor_sprites, self.laser_sprites,
+                      self.explosion_sprites):
+            for sprite in group.sprites():
+                sprite.kill()
+        for star in self.stars:
+            star.place(self.star_rng)
+        if self.render:
+            self.renderer.set_background(bake_starfield(
+                (WINDOW_WIDTH, WINDOW_HEIGHT), self.star_surf, self.stars))
+        self.player.reset()
+
+        self.running = True
+        self.score = 0
+        self.meteors_destroyed = 0
         self.meteor_timer = 0.0
 
+    @profiling.timed('game.step')
     def step(self, action, dt):
+        if self.render:
+            # Posições antes do passo, para interpolar o desenho
+            fixed_step.remember_positions(self.all_sprites)
         self.player.external_update(action, dt)
         self.all_sprites.update(dt)
         self._collisions()
         self._spawn_meteors(dt)
         self.score += dt
 
+    @profiling.timed('game.spawn_meteors')
     def _spawn_meteors(self, dt):
         self.meteor_timer += dt
         if self.meteor_timer > 0.5:
             px, py = self.player.rect.center  # Posição atual do player
 
-            if random.random() < 0.1:  # 10% dos meteoros miram o player
-                x = random.choice([0, WINDOW_WIDTH])
-                y = randint(-200, -100)
+            if self.rng.random() < 0.1:  # 10% dos meteoros miram o player
+                x = self.rng.choice([0, WINDOW_WIDTH])
+                y = self.rng.randint(-200, -100)
                 direction = pygame.Vector2(px - x, py - y).normalize()
-                Meteor(self.meteor_surf, (x, y), (self.all_sprites,
-                                                  self.meteor_sprites), direction=direction)
+                self.meteor_pool.acquire(
+                    (self.all_sprites, self.meteor_sprites),
+                    self.meteor_surf, (x, y), self.rng, direction=direction)
             else:
-                x, y = randint(0, WINDOW_WIDTH), randint(-200, -100)
-                Meteor(self.meteor_surf, (x, y),
-                       (self.all_sprites, self.meteor_sprites))
+                x = self.rng.randint(0, WINDOW_WIDTH)
+                y = self.rng.randint(-200, -100)
+                self.meteor_pool.acquire(
+                    (self.all_sprites, self.meteor_sprites),
+                    self.meteor_surf, (x, y), self.rng)
             self.meteor_timer = 0.0
 
+    @profiling.timed('game.collisions')
     def _collisions(self):
         collision_sprites = pygame.sprite.spritecollide(
-            self.player, self.meteor_sprites, True, pygame.sprite.collide_mask)
+            self.player, self.meteor_sprites, True, collide_mask_fast)
         if collision_sprites:
             self.running = False
 
@@ -211,151 +299,246 @@ class SpaceShooterGame:
                 laser.kill()
                 self.meteors_destroyed += len(collided_sprites)
                 if self.render:
-                    AnimatedExplosion(self.explosion_frames,
-                                      laser.rect.midtop, self.all_sprites)
+                    self.explosion_pool.acquire(
+                        (self.all_sprites, self.explosion_sprites),
+                        self.explosion_frames, laser.rect.midtop)
 
+    @profiling.timed('game.get_state')
     def get_state(self):
-        num_sectors = 16
-        max_dist = math.hypot(WINDOW_WIDTH, WINDOW_HEIGHT)
-        radar = [0.0] * num_sectors
-
         px, py = self.player.rect.center
-
-        for m in self.meteor_sprites:
-            mx, my = m.rect.center
-            dx, dy = mx-px, my-py
-            angle = (math.atan2(dy, dx) + 2*math.pi) % (2*math.pi)
-            dist = math.hypot(dx, dy)
-            sector = int(angle // (2 * math.pi / num_sectors))
-            norm_dist = 1.0 - min(dist/max_dist, 1.0)
-            if radar[sector] < norm_dist:
-                radar[sector] = norm_dist
-
-        # Estado final: posição normalizada do player + radar + pode atirar
-        state = [
-            px / WINDOW_WIDTH * 2 - 1,
-            py / WINDOW_HEIGHT * 2 - 1,
-            *radar,
-            1.0 if self.player.can_shoot else 0.0
-        ]
-
+        pos = np.array([m.rect.center for m in self.meteor_sprites])
+        pos = pos.reshape(-1, 2)
+
+        state = self.state
+        state[0] = px / WINDOW_WIDTH * 2 - 1
+        state[1] = py / WINDOW_HEIGHT * 2 - 1
+        radar = state[2:-1]
+        sensors.radar(px, py, pos[:, 0], pos[:, 1], self.num_sectors, radar)
+        state[-1] = 1.0 if self.player.can_shoot else 0.0
         return state
 
-    def draw(self):
+    def draw(self, alpha=1.0):
         if not self.render:
             return
-        self.display_surface.fill('#04010f')
-        self.all_sprites.draw(self.display_surface)
-        pygame.display.update()
+        self.renderer.begin()
+        self.renderer.draw(self.all_sprites, alpha)
+        self.renderer.present()
 
     def quit(self):
         pygame.quit()
 
-# --- Função de avaliação PARA UM GENOMA (usada pelo ParallelEvaluator) ---
-
-
-def eval_single_genome(genome, config):
-
-    dt = 1/60
-    MAX_STEPS = 60 * 90  # 90 segundos a 60 FPS
-    N_EPISODES = 3       # Número de episódios por genoma
-    total_fitness = 0.0
-
-    for ep in range(N_EPISODES):
-        # Seeds diferentes para cada episódio
-        # random.seed(ep)
-        # pyseed(ep)
-
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
-        game = SpaceShooterGame(render=False)
-        fitness = 0
-        steps = 0
-        SAFE_RADIUS = 80  # pixels
-
-        alive = True
-        while alive and steps < MAX_STEPS:
-            if not game.running:
-                fitness -= 5
-                alive = False
-                break
-
-            state = game.get_state()
-            output = net.activate(state)
-            move_x = 1 if output[0] > 0.5 else (
-                -1 if output[0] < -0.5 else 0)
-            move_y = 1 if output[1] > 0.5 else (
-                -1 if output[1] < -0.5 else 0)
-            shoot = 1 if output[2] > 0.5 else 0
-            game.step([move_x, move_y, shoot], dt)
+# --- Função de avaliação PARA UM GENOMA (usada pelo CommonSeedEvaluator) ---
+
+
+N_EPISODES = 3  # Número de episódios por genoma
+SAFE_RADIUS = 80  # pixels
+DT = 1/60  # passo da simulação, no treino e no replay
+MAX_STEPS = 60 * 90  # 90 segundos a 60 FPS
+# Modo racing: fração dos genomas que joga cada episódio
+RACING_SCHEDULE = (1.0, 0.5, 0.25)
+# As seeds ficam fixas por algumas gerações para o cache de fitness acertar
+# os elites e genomas repetidos
+RESEED_EVERY = 5
+GENERATIONS = 80
+CHECKPOINT_EVERY = 5  # gerações entre checkpoints
+KEEP_CHECKPOINTS = 3
+CHECKPOINT_PREFIX = 'option-checkpoint-'
+
+
+_worker_game = None
+
+
+def worker_game(num_sectors):
+    # Um jogo por processo, reiniciado com reset() a cada episódio
+    global _worker_game
+    if _worker_game is None or _worker_game.num_sectors != num_sectors:
+        _worker_game = SpaceShooterGame(render=False, num_sectors=num_sectors)
+    return _worker_game
+
+
+class Episode:
+    # Um episódio de um genoma numa seed, passo a passo. O treino
+    # (eval_episodes) e o replay (play_best) jogam por aqui, então o replay
+    # das seeds gravadas no genoma reproduz a fitness do treino
+    def __init__(self, game, net, seed):
+        game.reset(seed)
+        self.game = game
+        self.net = net
+        self.fitness = 0
+        self.steps = 0
+        self.done = False
+
+    def step(self):
+        # Joga um passo; False quando o episódio terminou
+        game = self.game
+        if self.done or self.steps >= MAX_STEPS:
+            return False
+        if not game.running:
+            self.fitness -= 5
+            self.done = True
+            return False
 
-            # FITNESS AJUSTADO
-
-            # Recompensa sobreviver (pouco)
-            fitness += dt * 0.1
-
-            # Recompensa MUITO destruir meteoros
-            fitness += game.meteors_destroyed * 50.0
-            game.meteors_destroyed = 0
-
-            px, _ = game.player.rect.center
-            if (px - SAFE_RADIUS < 0 or px + SAFE_RADIUS > WINDOW_WIDTH):
-                # Avisa ou penaliza
-                # Exemplo: penalização forte
-                fitness -= dt * 10.0
-            # Ou: self.running = False  # Se quiser terminar o episódio
-
-            # Penaliza ficar parado
-            if abs(game.player.direction.x) < 0.01 and abs(game.player.direction.y) < 0.01:
-                fitness -= dt * 0.5  # Mais forte!
-
-            # Penaliza movimento só para direita (vício do canto direito)
-            if game.player.direction.x > 0.8:
-                fitness -= dt * 1.0  # Forte penalização
-
-            # Penaliza ficar perto das bordas/cantos (aumente a força!)
-            margin = 120
-            left = game.player.rect.left
-            right = game.player.rect.right
-            top = game.player.rect.top
-            bottom = game.player.rect.bottom
-
-            dist_left = left
-            dist_right = WINDOW_WIDTH - right
-            dist_top = top
-            dist_bottom = WINDOW_HEIGHT - bottom
-            min_dist_to_edge = min(dist_left, dist_right,
-                                   dist_top, dist_bottom)
-            if min_dist_to_edge < margin:
-                # Penalização exponencial quanto mais perto da borda
-                edge_penalty = (margin - min_dist_to_edge) / margin
-                fitness -= dt * (10.0 * (edge_penalty ** 2))
-
-            # Se morreu, penaliza muito!
-            if not game.running:
-                fitness -= 20
-
-            steps += 1
-
-        total_fitness += fitness
-
-    return total_fitness / N_EPISODES
-
-# --- Treinamento NEAT COM ParallelEvaluator ---
-
-
-def run_neat(config_file):
-
-    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                         config_file)
-    p = neat.Population(config)
+        state = game.get_state()
+        output = self.net.activate(state)
+        move_x = 1 if output[0] > 0.5 else (-1 if output[0] < -0.5 else 0)
+        move_y = 1 if output[1] > 0.5 else (-1 if output[1] < -0.5 else 0)
+        shoot = 1 if output[2] > 0.5 else 0
+        game.step([move_x, move_y, shoot], DT)
+        profile = profiling.ENABLED
+        if profile:
+            shaping = time.perf_counter()
+
+        # FITNESS AJUSTADO
+
+        # Recompensa sobreviver (pouco)
+        self.fitness += DT * 0.1
+
+        # Recompensa MUITO destruir meteoros
+        self.fitness += game.meteors_destroyed * 50.0
+        game.meteors_destroyed = 0
+
+        px, _ = game.player.rect.center
+        if (px - SAFE_RADIUS < 0 or px + SAFE_RADIUS > WINDOW_WIDTH):
+            # Avisa ou penaliza
+            # Exemplo: penalização forte
+            self.fitness -= DT * 10.0
+        # Ou: self.running = False  # Se quiser terminar o episódio
+
+        # Penaliza ficar parado
+        if abs(game.player.direction.x) < 0.01 and abs(game.player.direction.y) < 0.01:
+            self.fitness -= DT * 0.5  # Mais forte!
+
+        # Penaliza movimento só para direita (vício do canto direito)
+        if game.player.direction.x > 0.8:
+            self.fitness -= DT * 1.0  # Forte penalização
+
+        # Penaliza ficar perto das bordas/cantos (aumente a força!)
+        margin = 120
+        left = game.player.rect.left
+        right = game.player.rect.right
+        top = game.player.rect.top
+        bottom = game.player.rect.bottom
+
+        dist_left = left
+        dist_right = WINDOW_WIDTH - right
+        dist_top = top
+        dist_bottom = WINDOW_HEIGHT - bottom
+        min_dist_to_edge = min(dist_left, dist_right,
+                               dist_top, dist_bottom)
+        if min_dist_to_edge < margin:
+            # Penalização exponencial quanto mais perto da borda
+            edge_penalty = (margin - min_dist_to_edge) / margin
+            self.fitness -= DT * (10.0 * (edge_penalty ** 2))
+
+        # Se morreu, penaliza muito!
+        if not game.running:
+            self.fitness -= 20
+
+        if profile:
+            profiling.add('fitness', time.perf_counter() - shaping)
+        self.steps += 1
+        return True
+
+
+def eval_episodes(genome, config, seeds=None):
+    # Fitness de cada episódio, um por seed. Sem seeds, joga N_EPISODES
+    # episódios com campos de meteoros sorteados
+    episode_fitness = []
+
+    # A rede é compilada uma vez e reutilizada em todos os episódios
+    net = CompiledNetwork.create(genome, config)
+    num_sectors = config.genome_config.num_inputs - 3
+    game = worker_game(num_sectors)
+    if seeds is None:
+        seeds = [None] * N_EPISODES
+    if profiling.ENABLED:
+        pools_before = pool_stats(game.pools)
+    for seed in seeds:
+        episode = Episode(game, net, seed)
+        while episode.step():
+            pass
+        if profiling.ENABLED:
+            profiling.add('steps', 0.0, episode.steps)
+        episode_fitness.append(episode.fitness)
+    if profiling.ENABLED:
+        record_churn(game.pools, pools_before)
+
+    return episode_fitness
+
+
+def eval_single_genome(genome, config, seeds=None):
+    episode_fitness = eval_episodes(genome, config, seeds)
+    return sum(episode_fitness) / len(episode_fitness)
+
+# --- Treinamento NEAT COM CommonSeedEvaluator ---
+
+
+def run_neat(config_file, racing=False, distributed_address=None,
+             resume_from=None):
+
+    if resume_from is not None:
+        # Continua de um checkpoint: população, espécies, contadores e RNGs
+        p, extra = checkpoint.restore(resume_from)
+        print(f"Retomando de {resume_from} (geração {p.generation})")
+        # Sem flags, retoma com o mesmo avaliador do checkpoint
+        if not racing and distributed_address is None:
+            racing = extra.get('racing', False)
+            distributed_address = extra.get('distributed_address')
+    else:
+        config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                             neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                             config_file)
+        p = neat.Population(config)
+        extra = None
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
 
+    # Carrega os assets e todas as rotações do meteoro antes do fork para
+    # os workers herdarem; o cache de rotação fica com tamanho fixo
+    assets.preload()
+    rotation_cache.get_rotation_cache(
+        'meteor', assets.image('meteor.png'), ROTATION_STEP).build_all()
+    assets.report()
+    rotation_cache.report()
+
     # Ajuste o número de workers conforme sua máquina!
-    pe = ParallelEvaluator(num_workers=8, eval_function=eval_single_genome)
-    winner = p.run(pe.evaluate, 80)
+    # Todos os genomas de uma geração jogam os mesmos N_EPISODES episódios
+    cache = FitnessCache()
+    if distributed_address is not None:
+        # Coordenador: os workers (python <script> worker host:porta) podem
+        # estar em outras máquinas e entrar ou sair durante o treino
+        pe = distributed.DistributedEvaluator(
+            eval_function=eval_single_genome, episodes=N_EPISODES,
+            authkey=distributed.require_authkey(),
+            address=distributed_address, reseed_every=RESEED_EVERY,
+            cache=cache)
+    elif racing:
+        # Genomas claramente piores param de jogar depois do 1º episódio
+        pe = RacingEvaluator(num_workers=8, episode_function=eval_episodes,
+                             schedule=RACING_SCHEDULE,
+                             reseed_every=RESEED_EVERY, cache=cache)
+    else:
+        pe = CommonSeedEvaluator(num_workers=8,
+                                 eval_function=eval_single_genome,
+                                 episodes=N_EPISODES,
+                                 reseed_every=RESEED_EVERY, cache=cache)
+    if extra is not None:
+        pe.restore_seed_state(extra['evaluator'])
+
+    checkpointer = checkpoint.AsyncCheckpointer(
+        p, generation_interval=CHECKPOINT_EVERY, keep=KEEP_CHECKPOINTS,
+        prefix=CHECKPOINT_PREFIX,
+        extra_state=lambda: {'evaluator': pe.seed_state(),
+                             'racing': racing,
+                             'distributed_address': distributed_address})
+    p.add_reporter(checkpointer)
+    if profiling.ENABLED:
+        p.add_reporter(profiling.ProfileReporter(cache=cache))
+    winner = p.run(pe.evaluate, GENERATIONS - p.generation)
+    checkpointer.close()
+    cache.report()
+    rotation_cache.report()
 
     with open("best_genome.pkl", "wb") as f:
         pickle.dump(winner, f)
@@ -364,8 +547,21 @@ def run_neat(config_file):
 # --- Visualizar o melhor agente ---
 
 
+def watch_episode(game, episode, loop):
+    # Joga o episódio na tela até o fim; False se a janela foi fechada
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        for _ in range(loop.frame()):
+            if not episode.step():
+                return True
+        game.draw(loop.alpha)
+
+
 def play_best(config_file, genome_file):
-    # Semente fixa para ambiente igual ao do treino!
+    # Rejoga as seeds em que o genoma foi avaliado no treino (eval_seeds,
+    # gravadas pelo avaliador): mesmo jogo, mesma fitness do treino
 
     config = neat.Config(
         neat.DefaultGenome,
@@ -376,22 +572,29 @@ def play_best(config_file, genome_file):
     )
     with open(genome_file, "rb") as f:
         genome = pickle.load(f)
-    net = neat.nn.FeedForwardNetwork.create(genome, config)
-    game = SpaceShooterGame(render=True)
-    # Use dt fixo para garantir física idêntica ao treino!
-    dt = 1/60
-    while game.running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                game.running = False
-        state = game.get_state()
-        output = net.activate(state)
-        move_x = 1 if output[0] > 0.5 else (-1 if output[0] < -0.5 else 0)
-        move_y = 1 if output[1] > 0.5 else (-1 if output[1] < -0.5 else 0)
-        shoot = 1 if output[2] > 0.5 else 0
-        game.step([move_x, move_y, shoot], dt)
-        game.draw()
-    print("Score do melhor agente:", game.score)
+    net = CompiledNetwork.create(genome, config)
+    num_sectors = config.genome_config.num_inputs - 3
+    game = SpaceShooterGame(render=True, num_sectors=num_sectors)
+    recorded = getattr(genome, 'eval_seeds', None)
+    seeds = recorded or [None]
+    # Passo fixo DT, igual ao do treino; a tela é desenhada em até
+    # FPS_CAP quadros/s, interpolando entre os passos
+    loop = fixed_step.FixedStepLoop(step_dt=DT, fps_cap=FPS_CAP)
+    episode_fitness = []
+    for seed in seeds:
+        episode = Episode(game, net, seed)
+        if not watch_episode(game, episode, loop):
+            break
+        print(f"Seed {seed}: score {game.score:.1f}, "
+              f"fitness {episode.fitness:.2f}")
+        episode_fitness.append(episode.fitness)
+    # Sem seeds gravadas os episódios foram outros: não há o que comparar
+    if (recorded and len(episode_fitness) == len(seeds)
+            and genome.fitness is not None):
+        print(f"Fitness do replay: "
+              f"{sum(episode_fitness) / len(episode_fitness):.2f} "
+              f"(treino: {genome.fitness:.2f})")
+    rotation_cache.report()
     game.quit()
 
 # --- Main ---
@@ -400,7 +603,33 @@ def play_best(config_file, genome_file):
 if __name__ == "__main__":
     if len(sys.argv) == 2 and sys.argv[1] == "train":
         run_neat("config-feedforward.txt")
+    elif len(sys.argv) == 2 and sys.argv[1] == "race":
+        run_neat("config-feedforward.txt", racing=True)
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "serve":
+        # Só localhost por padrão; para workers em outras máquinas, passe o
+        # host da interface (ex.: 0.0.0.0:50000)
+        address = sys.argv[2] if len(sys.argv) == 3 else ""
+        distributed.require_authkey()
+        run_neat("config-feedforward.txt",
+                 distributed_address=distributed.parse_address(address))
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "worker":
+        address = sys.argv[2] if len(sys.argv) == 3 else ""
+        distributed.run_worker(distributed.parse_address(address),
+                               distributed.require_authkey())
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "resume":
+        path = (sys.argv[2] if len(sys.argv) == 3 else
+                checkpoint.latest_checkpoint(prefix=CHECKPOINT_PREFIX))
+        if path is None:
+            print("Nenhum checkpoint encontrado em",
+                  checkpoint.DEFAULT_DIRECTORY)
+        else:
+            run_neat("config-feedforward.txt", resume_from=path)
     elif len(sys.argv) == 2 and sys.argv[1] == "play":
         play_best("config-feedforward.txt", "best_genome.pkl")
     else:
-        print("Use:\n  python space_shooter_neat.py train\n  python space_shooter_neat.py play")
+        print("Use:\n  python space_shooter_neat.py train [--profile]\n"
+              "  python space_shooter_neat.py race\n"
+              "  python space_shooter_neat.py serve [host:porta]\n"
+              "  python space_shooter_neat.py worker [host:porta]\n"
+              "  python space_shooter_neat.py resume [checkpoint]\n"
+              "  python space_shooter_neat.py play")
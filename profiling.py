@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import sys
+import time
+
+import neat
+
+# Tempo por fase dos hot paths do treino (game.step, get_state, activate,
+# colisões, spawn, fitness, IPC). Ligado com SPACE_SHOOTER_PROFILE=1 ou
+# --profile na linha de comando, antes dos imports dos scripts. Desligado, o
+# decorator `timed` devolve a própria função: custo zero no hot path.
+#
+# Os tempos são somados por processo; nos workers do Pool cada job volta com
+# os seus (`Collected`) e o processo principal junta tudo (`unwrap`). Fases
+# aninhadas (game.step contém collisions e spawn) somam mais que 100%.
+
+ENABLED = (os.environ.get('SPACE_SHOOTER_PROFILE') == '1'
+           or '--profile' in sys.argv)
+if ENABLED:
+    os.environ['SPACE_SHOOTER_PROFILE'] = '1'  # workers herdam a flag
+
+_totals = {}  # fase -> [segundos, chamadas]
+
+
+def add(name, seconds, calls=1):
+    entry = _totals.get(name)
+    if entry is None:
+        _totals[name] = [seconds, calls]
+    else:
+        entry[0] += seconds
+        entry[1] += calls
+
+
+def timed(name):
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def snapshot(reset=False):
+    totals = {name: tuple(entry) for name, entry in _totals.items()}
+    if reset:
+        _totals.clear()
+    return totals
+
+
+def merge(totals):
+    for name, (seconds, calls) in totals.items():
+        add(name, seconds, calls)
+
+
+class Collected:
+    # Envolve a função de avaliação enviada aos workers: devolve
+    # (resultado, tempos do job) para o processo principal somar
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        snapshot(reset=True)
+        start = time.perf_counter()
+        result = self.func(*args, **kwargs)
+        add('job', time.perf_counter() - start)
+        return result, snapshot(reset=True)
+
+
+def unwrap(results, wall=None, workers=1):
+    # Junta os tempos dos jobs e devolve só os resultados. O que sobra do
+    # tempo de parede além do trabalho dos workers é contado como IPC
+    busy = 0.0
+    values = []
+    for value, totals in results:
+        merge(totals)
+        busy += totals.get('job', (0.0, 0))[0]
+        values.append(value)
+    if wall is not None:
+        add('ipc', max(0.0, wall - busy / max(workers, 1)))
+    return values
+
+
+class ProfileReporter(neat.reporting.BaseReporter):
+    def __init__(self, path='profile.jsonl', top=12, cache=None):
+        # cache: FitnessCache do treino, se houver (acertos acumulados)
+        self.path = path
+        self.top = top
+        self.cache = cache
+        self.generation = None
+        self.start = None
+        self.evaluated = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+        snapshot(reset=True)
+        self.start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.evaluated = time.perf_counter()
+
+    def end_generation(self, config, population, species_set):
+        end = time.perf_counter()
+        add('reproduction', end - (self.evaluated or end))
+        wall = end - self.start
+        totals = snapshot(reset=True)
+        steps = totals.pop('steps', (0, 0))[1]
+        # Contadores dos pools de sprites: 'pool.<nome>.<created|reused>'
+        pools = {}
+        for name in [name for name in totals if name.startswith('pool.')]:
+            _, pool, key = name.split('.')
+            pools.setdefault(pool, {})[key] = totals.pop(name)[1]
+        record = {
+            'generation': self.generation,
+            'wall': wall,
+            'steps': steps,
+            'steps_per_sec': steps / wall if wall > 0 else 0.0,
+            'phases': {name: {'seconds': seconds, 'calls': calls}
+                       for name, (seconds, calls) in totals.items()},
+        }
+        if pools:
+            record['sprite_pools'] = pools
+        if self.cache is not None:
+            record['fitness_cache'] = self.cache.stats()
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+        print(f"Perfil da geração {self.generation}: {wall:.2f} s, "
+              f"{steps} passos ({record['steps_per_sec']:.0f} passos/s)")
+        ranked = sorted(totals.items(), key=lambda item: item[1][0],
+                        reverse=True)
+        for name, (seconds, calls) in ranked[:self.top]:
+            print(f"  {name:<20} {seconds:8.3f} s {100 * seconds / wall:6.1f}% "
+                  f"{calls:>9} chamadas "
+                  f"{1e6 * seconds / max(calls, 1):8.1f} us/chamada")
+        if pools:
+            print("  pools de sprites: " + ", ".join(
+                f"{pool} {counts.get('created', 0)} criados/"
+                f"{counts.get('reused', 0)} reusados"
+                for pool, counts in sorted(pools.items())))
+        if self.cache is not None:
+            self.cache.report()
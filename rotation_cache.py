@@ -0,0 +1,69 @@
+import pygame
+
+# Cache de rotações pré-renderizadas, compartilhado por todo o processo.
+# Em vez de chamar rotozoom em todo meteoro a cada frame, o ângulo é
+# quantizado em passos de `step` graus e cada quadro (surface + máscara)
+# é gerado uma única vez, na primeira vez que for pedido.
+
+DEFAULT_STEP = 2  # graus
+
+_caches = {}
+
+
+class RotationCache:
+    def __init__(self, name, surf, step=DEFAULT_STEP):
+        self.name = name
+        self.surf = surf
+        self.step = step
+        self.num_frames = max(1, round(360 / step))
+        self.frames = [None] * self.num_frames
+        self.masks = [None] * self.num_frames
+
+    def index(self, angle):
+        return round(angle / self.step) % self.num_frames
+
+    def get(self, angle):
+        i = self.index(angle)
+        frame = self.frames[i]
+        if frame is None:
+            frame = pygame.transform.rotozoom(
+                self.surf, i * self.step, 1)
+            self.frames[i] = frame
+            self.masks[i] = pygame.mask.from_surface(frame)
+        return frame, self.masks[i]
+
+    def build_all(self):
+        # Gera todos os quadros de uma vez (ex.: antes do fork dos workers)
+        for i in range(self.num_frames):
+            self.get(i * self.step)
+
+    def memory_bytes(self):
+        total = 0
+        for frame in self.frames:
+            if frame is not None:
+                w, h = frame.get_size()
+                # Pixels RGBA + máscara de 1 bit por pixel
+                total += w * h * frame.get_bytesize() + w * h // 8
+        return total
+
+    def stats(self):
+        built = sum(frame is not None for frame in self.frames)
+        return {'name': self.name, 'step': self.step, 'frames': built,
+                'max_frames': self.num_frames, 'bytes': self.memory_bytes()}
+
+
+def get_rotation_cache(name, surf, step=DEFAULT_STEP):
+    key = (name, step)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = RotationCache(name, surf, step)
+        _caches[key] = cache
+    return cache
+
+
+def report():
+    for cache in _caches.values():
+        s = cache.stats()
+        print(f"Cache de rotação '{s['name']}' (passo {s['step']}°): "
+              f"{s['frames']}/{s['max_frames']} quadros, "
+              f"{s['bytes'] / 1024 / 1024:.1f} MB")
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Sensores de observação em numpy. Escrevem direto no buffer `out` passado
+# pelo jogo, sem montar listas Python a cada passo.
+
+WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+SPEED_SCALE = 500
+
+
+def nearest_meteors_batch(px, py, mx, my, mvx, mvy, valid, k, out):
+    # k meteoros mais próximos de cada jogo do BatchSpaceShooter, com seleção
+    # parcial (argpartition) e ordenação só dos k escolhidos. out: (N, k, 4)
+    # com (dx, dy, vx, vy) normalizados; zeros se faltar meteoro
+    dx = mx - px[:, None]
+    dy = my - py[:, None]
+    dist2 = np.where(valid, dx * dx + dy * dy, np.inf)
+    if dist2.shape[1] > k:
+        idx = np.argpartition(dist2, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(dist2, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+    else:
+        idx = np.argsort(dist2, axis=1)
+    found = np.isfinite(np.take_along_axis(dist2, idx, axis=1))
+    n = idx.shape[1]
+    out[:, :n, 0] = np.take_along_axis(dx, idx, axis=1) / WINDOW_WIDTH
+    out[:, :n, 1] = np.take_along_axis(dy, idx, axis=1) / WINDOW_HEIGHT
+    out[:, :n, 2] = np.take_along_axis(mvx, idx, axis=1) / SPEED_SCALE
+    out[:, :n, 3] = np.take_along_axis(mvy, idx, axis=1) / SPEED_SCALE
+    out[:, :n] *= found[..., None]
+    out[:, n:] = 0
+    return out
+
+
+MAX_DIST = float(np.hypot(WINDOW_WIDTH, WINDOW_HEIGHT))
+
+
+def _radar_bins(dx, dy, num_sectors):
+    # Setor angular e proximidade normalizada (1 = colado, 0 = longe)
+    angle = (np.arctan2(dy, dx) + 2 * np.pi) % (2 * np.pi)
+    sector = (angle // (2 * np.pi / num_sectors)).astype(np.intp)
+    np.minimum(sector, num_sectors - 1, out=sector)
+    closeness = 1.0 - np.minimum(np.hypot(dx, dy) / MAX_DIST, 1.0)
+    return sector, closeness
+
+
+def radar(px, py, mx, my, num_sectors, out):
+    # out: (num_sectors,) com a maior proximidade de meteoro em cada setor
+    sector, closeness = _radar_bins(mx - px, my - py, num_sectors)
+    out[:] = 0.0
+    np.maximum.at(out, sector, closeness)
+    return out
+
+
+def radar_batch(px, py, mx, my, valid, num_sectors, out):
+    # Versão (N, M); out: (N, num_sectors). Scatter-max num índice achatado
+    n = len(px)
+    sector, closeness = _radar_bins(mx - px[:, None], my - py[:, None],
+                                    num_sectors)
+    flat = (np.arange(n)[:, None] * num_sectors + sector)[valid]
+    values = np.zeros(n * num_sectors)
+    np.maximum.at(values, flat, closeness[valid])
+    out[:] = values.reshape(n, num_sectors)
+    return out
+
+
+def offscreen_sectors(px, py, num_sectors, out):
+    # Marca com 1.0 os setores cuja direção, a MAX_DIST do player, sai da tela
+    theta = np.arange(num_sectors) * (2 * np.pi / num_sectors)
+    test_x = px + np.cos(theta) * MAX_DIST
+    test_y = py + np.sin(theta) * MAX_DIST
+    outside = ~((0 <= test_x) & (test_x < WINDOW_WIDTH) &
+                (0 <= test_y) & (test_y < WINDOW_HEIGHT))
+    out[outside] = 1.0
+    return out
@@ -1,115 +1,112 @@
 import pygame
-from os.path import join
-from random import randint, uniform
+import random
 import pickle
 import neat
 import os
 import sys
-
-if len(sys.argv) == 2 and sys.argv[1] == "train":
+import time
+
+import numpy as np
+
+from batch_env import (BatchSpaceShooter, METEOR_LIFE_TIME, WINDOW_HEIGHT,
+                       WINDOW_WIDTH)
+import assets
+import checkpoint
+from collision import PixelHits
+from dirty_render import DirtyRenderer, bake_starfield
+from fitness_cache import FitnessCache, genome_key
+import fixed_step
+from net_compiler import BatchedNetworks
+import profiling
+import rotation_cache
+from sprite_pool import PooledSprite, SpritePool
+
+if "--profile" in sys.argv:
+    sys.argv.remove("--profile")  # profiling.ENABLED já leu a flag
+if len(sys.argv) >= 2 and sys.argv[1] in ("train", "resume"):
     os.environ["SDL_VIDEODRIVER"] = "dummy"
 
 pygame.init()
 pygame.display.set_mode((1, 1))  # Cria contexto de vídeo oculto
 
 
-WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+ROTATION_STEP = 2  # graus, quantização das rotações dos meteoros
+FPS_CAP = 120  # quadros/s na tela no modo play; a simulação segue em DT
+DT = 1/60  # passo da simulação, no treino e no replay
+MAX_STEPS = 60 * 30  # 30 segundos a 60 FPS
+
+
+def genome_actions(outputs):
+    # Saídas das redes -> ações (mover x, mover y, atirar) de cada jogo
+    actions = np.zeros((len(outputs), 3))
+    actions[:, :2] = np.where(outputs[:, :2] > 0.5, 1,
+                              np.where(outputs[:, :2] < -0.5, -1, 0))
+    actions[:, 2] = outputs[:, 2] > 0.5
+    return actions
+
+
+def fitness_gain(env, events, dt):
+    # Recompensa de um passo para cada jogo do lote, usada no treino e no
+    # replay
+    gain = dt * 0.5 + events['meteors_destroyed'] * 5.0
+
+    idle = (np.abs(env.pdx) < 0.01) & (np.abs(env.pdy) < 0.01)
+    gain -= idle * dt * 0.1  # Penalidade leve mas constante
+
+    margin = 100
+    near_edge = ((env.px < margin) | (env.px > WINDOW_WIDTH - margin) |
+                 (env.py < margin) | (env.py > WINDOW_HEIGHT - margin))
+    gain -= near_edge * dt * 2.0
+
+    move_mag = np.abs(env.pdx) + np.abs(env.pdy)
+    gain += move_mag * dt * 0.05
+    return gain
 
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, groups, laser_surf, laser_group, all_sprites):
-        super().__init__(groups)
-        self.image = pygame.image.load(
-            join('images', 'player.png')).convert_alpha()
-        self.rect = self.image.get_frect(
-            center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
-        self.direction = pygame.math.Vector2()
-        self.speed = 300
-        # Cooldown
-        self.can_shoot = True
-        self.laser_shoot_time = 0
-        self.cooldown_duration = 400
-
-        self.laser_surf = laser_surf
-        self.laser_group = laser_group
-        self.all_sprites = all_sprites
-
-    def external_update(self, action, dt):
-        # action: [move_x, move_y, shoot]
-        self.direction.x = action[0]
-        self.direction.y = action[1]
-        if self.direction.length_squared() > 0:
-            self.direction = self.direction.normalize()
-        self.rect.center += self.direction * self.speed * dt
-
-        # Impede sair da tela
-        self.rect.clamp_ip(pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
-
-        if action[2] and self.can_shoot:
-            Laser(self.laser_surf, self.rect.midtop,
-                  (self.all_sprites, self.laser_group))
-            self.can_shoot = False
-            self.laser_shoot_time = pygame.time.get_ticks()
-
-        self.laser_timer()
-
-    def laser_timer(self):
-        if not self.can_shoot:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.laser_shoot_time >= self.cooldown_duration:
-                self.can_shoot = True
-
-
-class Star(pygame.sprite.Sprite):
-    def __init__(self, groups, surf):
+    def __init__(self, groups, pos):
         super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_frect(
-            center=(randint(0, WINDOW_WIDTH), randint(0, WINDOW_HEIGHT)))
+        self.image = assets.image('player.png')
+        self.rect = self.image.get_frect(center=pos)
 
 
-class Laser(pygame.sprite.Sprite):
-    def __init__(self, surf, pos, groups):
-        super().__init__(groups)
+class Laser(PooledSprite):
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
+
+    def spawn(self, surf, pos):
         self.image = surf
-        self.rect = self.image.get_frect(midbottom=pos)
+        self.rect.size = surf.get_size()
+        self.rect.center = pos
 
-    def update(self, dt):
-        self.rect.centery -= 400 * dt
-        if self.rect.bottom < 0:
-            self.kill()
 
+class Meteor(PooledSprite):
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
 
-class Meteor(pygame.sprite.Sprite):
-    def __init__(self, surf, pos, groups):
-        super().__init__(groups)
-        self.original_surf = surf
-        self.image = self.original_surf
-        self.rect = self.image.get_frect(center=pos)
-        self.start_time = pygame.time.get_ticks()
-        self.life_time = 3000
-        self.direction = pygame.Vector2(uniform(-0.5, 0.5), 1)
-        self.speed = randint(400, 500)
-        self.rotation = 0
-        self.rotation_speed = randint(40, 80)
+    def spawn(self, rotations, born):
+        self.rotations = rotations
+        self.born = born  # distingue este meteoro de outro no mesmo slot
 
-    def update(self, dt):
-        self.rect.center += self.direction * self.speed * dt
-        if pygame.time.get_ticks() - self.start_time >= self.life_time:
-            self.kill()
-        self.rotation += self.rotation_speed * dt
-        self.image = pygame.transform.rotozoom(
-            self.original_surf, self.rotation, 1)
-        self.rect = self.image.get_frect(center=self.rect.center)
+    def place(self, pos, angle):
+        self.image = self.rotations.get(angle)[0]
+        self.rect.size = self.image.get_size()
+        self.rect.center = pos
 
 
-class AnimatedExplosion(pygame.sprite.Sprite):
-    def __init__(self, frames, pos, groups):
-        super().__init__(groups)
+class AnimatedExplosion(PooledSprite):
+    def __init__(self, pool):
+        super().__init__(pool)
+        self.rect = pygame.FRect()
+
+    def spawn(self, frames, pos):
         self.frames = frames
         self.frame_index = 0
         self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_frect(center=pos)
+        self.rect.size = self.image.get_size()
+        self.rect.center = pos
 
     def update(self, dt):
         self.frame_index += 25 * dt
@@ -118,118 +115,130 @@ class AnimatedExplosion(pygame.sprite.Sprite):
         else:
             self.kill()
 
-# --- Classe principal do jogo para NEAT ---
 
+_pixel_hits = None
 
-class SpaceShooterGame:
-    def __init__(self, render=False):
 
+def pixel_hits():
+    # Colisão por pixel do player com as rotações do meteoro, montada uma vez
+    # por processo e usada no treino e no replay
+    global _pixel_hits
+    if _pixel_hits is None:
+        _pixel_hits = PixelHits(
+            assets.mask('player.png'), rotation_cache.get_rotation_cache(
+                'meteor', assets.image('meteor.png'), ROTATION_STEP))
+    return _pixel_hits
+
+
+class SpaceShooterGame:
+    # Um jogo do BatchSpaceShooter: o mesmo motor e a mesma física do treino.
+    # Com render=True, sprites espelham os slots do motor a cada passo e são
+    # desenhados interpolados pelo DirtyRenderer; nada do desenho interfere
+    # na simulação.
+    def __init__(self, render=False, n_nearest=8, seed=None):
+        self.env = BatchSpaceShooter(1, seed=seed, n_nearest=n_nearest, dt=DT,
+                                     hit_test=pixel_hits())
         self.render = render
+        self.state = self.env.get_state()
+        self.running = True
+        self.score = 0.0
+        self.fitness = 0.0
+        self.steps = 0
+
         if render:
             self.display_surface = pygame.display.set_mode(
                 (WINDOW_WIDTH, WINDOW_HEIGHT))
             pygame.display.set_caption('Space Shooter')
-        else:
-            self.display_surface = pygame.Surface(
-                (WINDOW_WIDTH, WINDOW_HEIGHT))
+            # Assets compartilhados (carregados uma vez por processo)
+            self.laser_surf = assets.image('laser.png')
+            self.rotations = rotation_cache.get_rotation_cache(
+                'meteor', assets.image('meteor.png'), ROTATION_STEP)
+            self.explosion_frames = assets.explosion_frames()
+
+            self.all_sprites = pygame.sprite.Group()
+            self.explosion_sprites = pygame.sprite.Group()
+            self.meteor_pool = SpritePool(Meteor)
+            self.laser_pool = SpritePool(Laser)
+            self.explosion_pool = SpritePool(AnimatedExplosion)
+            # Sprite de cada slot do motor (None: slot livre)
+            self.meteors = [None] * self.env.max_meteors
+            self.lasers = [None] * self.env.max_lasers
+            self.player = Player(self.all_sprites,
+                                 (self.env.px[0], self.env.py[0]))
+
+            # Estrelas com gerador próprio: não mexem no campo de meteoros
+            star_surf = assets.image('star.png')
+            star_rng = random.Random(seed)
+            stars = [star_surf.get_rect(center=(
+                star_rng.randint(0, WINDOW_WIDTH),
+                star_rng.randint(0, WINDOW_HEIGHT))) for _ in range(20)]
+            self.renderer = DirtyRenderer(self.display_surface, bake_starfield(
+                (WINDOW_WIDTH, WINDOW_HEIGHT), star_surf, stars))
 
-        self.clock = pygame.time.Clock()
-        self.running = True
-        self.score = 0
-        self.meteors_destroyed = 0
-
-        # Load assets
-        self.star_surf = pygame.image.load(
-            join('images', 'star.png')).convert_alpha()
-        self.meteor_surf = pygame.image.load(
-            join('images', 'meteor.png')).convert_alpha()
-        self.laser_surf = pygame.image.load(
-            join('images', 'laser.png')).convert_alpha()
-        self.font = pygame.font.Font(join('images', 'Oxanium-Bold.ttf'), 20)
-        self.explosion_frames = [pygame.image.load(
-            join('images', 'explosion', f'{i}.png')).convert_alpha() for i in range(21)]
-
-        # Sprite groups
-        self.all_sprites = pygame.sprite.Group()
-        self.meteor_sprites = pygame.sprite.Group()
-        self.laser_sprites = pygame.sprite.Group()
-
-        for _ in range(20):
-            Star(self.all_sprites, self.star_surf)
-
-        self.player = Player(self.all_sprites, self.laser_surf,
-                             self.laser_sprites, self.all_sprites)
-        self.meteor_timer = 0
+    def get_state(self):
+        # Cópia: o buffer do motor é reescrito no próximo passo
+        return self.state[0].copy()
 
     def step(self, action, dt):
-        self.player.external_update(action, dt)
-        self.all_sprites.update(dt)
-        self._collisions()
-        self._spawn_meteors(dt)
-        self.score += dt
-
-    def _spawn_meteors(self, dt):
-        self.meteor_timer += dt
-        if self.meteor_timer > 0.2:
-            x, y = randint(0, WINDOW_WIDTH), randint(-200, -100)
-            Meteor(self.meteor_surf, (x, y),
-                   (self.all_sprites, self.meteor_sprites))
-            self.meteor_timer = 0
-
-    def _collisions(self):
-        collision_sprites = pygame.sprite.spritecollide(
-            self.player, self.meteor_sprites, True, pygame.sprite.collide_mask)
-        if collision_sprites:
-            self.running = False
-
-        for laser in self.laser_sprites:
-            collided_sprites = pygame.sprite.spritecollide(
-                laser, self.meteor_sprites, True)
-            if collided_sprites:
+        # O motor anda no dt pedido; treino e replay usam sempre DT
+        env = self.env
+        env.dt = dt
+        if self.render:
+            # Posições antes do passo, para interpolar o desenho
+            fixed_step.remember_positions(self.all_sprites)
+        self.state, alive, events = env.step(np.asarray([action], dtype=float))
+        gain = fitness_gain(env, events, dt)[0]
+        self.fitness = max(self.fitness + gain, 0.0)
+        self.steps += 1
+        self.score = float(env.score[0])
+        # running também pode ser desligado de fora (ex.: janela fechada)
+        self.running = (self.running and bool(alive[0])
+                        and self.steps < MAX_STEPS)
+        if self.render:
+            self._sync_sprites(dt)
+
+    def _sync_sprites(self, dt):
+        env = self.env
+        self.explosion_sprites.update(dt)
+        self.player.rect.center = (env.px[0], env.py[0])
+
+        for i, meteor in enumerate(self.meteors):
+            alive = env.m_alive[0, i]
+            if meteor is not None and not (alive and
+                                           meteor.born == env.mborn[0, i]):
+                # Sumiu antes do fim da vida: foi destruído
+                if env.time[0] - meteor.born < METEOR_LIFE_TIME:
+                    self.explosion_pool.acquire(
+                        (self.all_sprites, self.explosion_sprites),
+                        self.explosion_frames, meteor.rect.center)
+                meteor.kill()
+                meteor = self.meteors[i] = None
+            if alive:
+                if meteor is None:
+                    meteor = self.meteors[i] = self.meteor_pool.acquire(
+                        (self.all_sprites,), self.rotations, env.mborn[0, i])
+                meteor.place((env.mx[0, i], env.my[0, i]), env.mrot[0, i])
+
+        for j, laser in enumerate(self.lasers):
+            alive = env.l_alive[0, j]
+            pos = (env.lx[0, j], env.ly[0, j])
+            # Laser novo no slot nasce abaixo de onde o anterior estava
+            if laser is not None and not (alive and
+                                          pos[1] < laser.rect.centery):
                 laser.kill()
-                self.meteors_destroyed += len(collided_sprites)
-                AnimatedExplosion(self.explosion_frames,
-                                  laser.rect.midtop, self.all_sprites)
-
-    def get_state(self):
-        px, py = self.player.rect.center
-
-        # Lista de (dist, dx, dy, vx, vy)
-        meteors = []
-        for m in self.meteor_sprites:
-            mx, my = m.rect.center
-            dx, dy = mx - px, my - py
-            dist = (dx*dx + dy*dy)**0.5
-            vx, vy = m.direction.x * m.speed, m.direction.y * m.speed
-            meteors.append((dist, dx / WINDOW_WIDTH, dy /
-                           WINDOW_HEIGHT, vx / 500, vy / 500))
-
-        meteors.sort(key=lambda x: x[0])
-        N = 8
-        state = [
-            px / WINDOW_WIDTH * 2 - 1,
-            py / WINDOW_HEIGHT * 2 - 1,
-        ]
-        # Adiciona dados dos N meteoros mais próximos
-        for i in range(N):
-            if i < len(meteors):
-                _, dx, dy, vx, vy = meteors[i]
-                state += [dx, dy, vx, vy]
-            else:
-                # Preenche com zeros se não houver meteoro suficiente
-                state += [0, 0, 0, 0]
-
-        # Adiciona info se pode atirar (1 se sim, 0 se não)
-        state.append(1.0 if self.player.can_shoot else 0.0)
-
-        return state
-
-    def draw(self):
+                laser = self.lasers[j] = None
+            if alive:
+                if laser is None:
+                    laser = self.lasers[j] = self.laser_pool.acquire(
+                        (self.all_sprites,), self.laser_surf, pos)
+                laser.rect.center = pos
+
+    def draw(self, alpha=1.0):
         if not self.render:
             return
-        self.display_surface.fill('#04010f')
-        self.all_sprites.draw(self.display_surface)
-        pygame.display.update()
+        self.renderer.begin()
+        self.renderer.draw(self.all_sprites, alpha)
+        self.renderer.present()
 
     def quit(self):
         pygame.quit()
@@ -237,83 +246,123 @@ class SpaceShooterGame:
 # --- Função de avaliação para o NEAT ---
 
 
-def eval_genomes(genomes, config):
+# A seed de avaliação é trocada a cada RESEED_EVERY gerações; enquanto ela
+# não muda, redes já avaliadas (elites, genomas que só diferem em genes
+# desabilitados) pegam a fitness do cache em vez de jogar de novo
+RESEED_EVERY = 5
+GENERATIONS = 50
+CHECKPOINT_EVERY = 5  # gerações entre checkpoints
+KEEP_CHECKPOINTS = 3
+CHECKPOINT_PREFIX = 'space_shooter_neat-checkpoint-'
+fitness_cache = FitnessCache()
+eval_seed = {'generation': 0, 'seed': None}
 
-    dt = 1/60
-    games = []
-    nets = []
-    ge = []
-
-    MAX_STEPS = 60 * 30  # 30 segundos a 60 FPS
-
-    for genome_id, genome in genomes:
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
-        game = SpaceShooterGame(render=False)
-        games.append(game)
-        nets.append(net)
-        ge.append(genome)
-        genome.fitness = 0
-
-    alive = [True]*len(games)
-    steps = 0  # inicializa aqui!
-
-    while any(alive) and steps < MAX_STEPS:
-        for i, game in enumerate(games):
-            if not alive[i]:
-                continue
-            if not game.running and alive[i]:
-                alive[i] = False
-                continue
-
-            state = game.get_state()
-            output = nets[i].activate(state)
-            move_x = 1 if output[0] > 0.5 else (-1 if output[0] < -0.5 else 0)
-            move_y = 1 if output[1] > 0.5 else (-1 if output[1] < -0.5 else 0)
-            shoot = 1 if output[2] > 0.5 else 0
-            game.step([move_x, move_y, shoot], dt)
-
-            # FITNESS
-            ge[i].fitness += dt * 0.5
-            ge[i].fitness += game.meteors_destroyed * 5.0
-            game.meteors_destroyed = 0
-
-            if abs(game.player.direction.x) < 0.01 and abs(game.player.direction.y) < 0.01:
-                ge[i].fitness -= dt * 0.1  # Penalidade leve mas constante
-
-            margin = 100
-            px, py = game.player.rect.center
-            if px < margin or px > WINDOW_WIDTH - margin or py < margin or py > WINDOW_HEIGHT - margin:
-                ge[i].fitness -= dt * 2.0
-
-            move_mag = abs(game.player.direction.x) + \
-                abs(game.player.direction.y)
-            ge[i].fitness += move_mag * dt * 0.05
-
-            if ge[i].fitness < 0:
-                ge[i].fitness = 0
-
-        steps += 1  # <<<<<<<< MOVA PARA FORA DO FOR!
+
+def next_eval_seed():
+    if eval_seed['generation'] % RESEED_EVERY == 0:
+        eval_seed['seed'] = random.randrange(2 ** 31)
+    eval_seed['generation'] += 1
+    return eval_seed['seed']
+
+
+def eval_genomes(genomes, config):
+    # Uma seed por geração, a mesma para todos os genomas (common random
+    # numbers): todos enfrentam a mesma sequência de meteoros. A seed fica
+    # gravada no genoma (eval_seeds, como no evaluation.py) para o replay
+    seed = next_eval_seed()
+    keys = [(genome_key(genome, config), seed) for genome_id, genome in genomes]
+    results = {}
+    pending = {}
+    for key, (genome_id, genome) in zip(keys, genomes):
+        if key in results or key in pending:
+            continue
+        cached = fitness_cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = genome
+    if pending:
+        fitness = simulate_genomes(list(pending.values()), config, seed)
+        for key, f in zip(pending, fitness):
+            results[key] = float(f)
+            fitness_cache.put(key, results[key])
+    for key, (genome_id, genome) in zip(keys, genomes):
+        genome.fitness = results[key]
+        genome.eval_seeds = (seed,)
+
+
+def simulate_genomes(ge, config, seed):
+
+    dt = DT
+
+    # Redes da população inteira avaliadas numa única chamada por passo
+    nets = BatchedNetworks.create(ge, config)
+
+    # Todos os jogos da população avançam juntos em um único BatchSpaceShooter;
+    # o número de meteoros observados segue o num_inputs da config. Cada jogo
+    # só depende da seed, então a fitness não muda com o tamanho do lote
+    n_nearest = (config.genome_config.num_inputs - 3) // 4
+    env = BatchSpaceShooter(len(ge), seed=seed, n_nearest=n_nearest, dt=dt,
+                            hit_test=pixel_hits())
+    obs = env.get_state()
+    alive = env.alive.copy()
+    fitness = np.zeros(len(ge))
+    steps = 0
+    profile = profiling.ENABLED
+
+    while alive.any() and steps < MAX_STEPS:
+        actions = genome_actions(nets.activate(obs, alive))
+        obs, now_alive, events = env.step(actions)
+        if profile:
+            shaping = time.perf_counter()
+
+        # FITNESS (só para quem estava vivo no início do passo)
+        gain = fitness_gain(env, events, dt)
+        fitness = np.where(alive, np.maximum(fitness + gain, 0), fitness)
+        if profile:
+            profiling.add('fitness', time.perf_counter() - shaping)
+            profiling.add('steps', 0.0, int(alive.sum()))
+        alive = now_alive
+        steps += 1
+
+    return fitness
 
 # --- Treinamento NEAT ---
 
 
-def run_neat(config_file):
-    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                         neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                         config_file)
-    # config = neat.Config(
-    #     neat.DefaultGenome,
-    #     neat.DefaultReproduction,
-    #     neat.DefaultSpeciesSet,
-    #     neat.DefaultStagnation,
-    #     config_file
-    # )
-    p = neat.Population(config)
+def run_neat(config_file, resume_from=None):
+    if resume_from is not None:
+        # Continua de um checkpoint: população, espécies, contadores e RNGs
+        p, extra = checkpoint.restore(resume_from)
+        eval_seed.update(extra['eval_seed'])
+        print(f"Retomando de {resume_from} (geração {p.generation})")
+    else:
+        config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                             neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                             config_file)
+        # config = neat.Config(
+        #     neat.DefaultGenome,
+        #     neat.DefaultReproduction,
+        #     neat.DefaultSpeciesSet,
+        #     neat.DefaultStagnation,
+        #     config_file
+        # )
+        p = neat.Population(config)
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
-
-    winner = p.run(eval_genomes, 50)  # 50 gerações
+    checkpointer = checkpoint.AsyncCheckpointer(
+        p, generation_interval=CHECKPOINT_EVERY, keep=KEEP_CHECKPOINTS,
+        prefix=CHECKPOINT_PREFIX,
+        extra_state=lambda: {'eval_seed': dict(eval_seed)})
+    p.add_reporter(checkpointer)
+    if profiling.ENABLED:
+        p.add_reporter(profiling.ProfileReporter(cache=fitness_cache))
+
+    winner = p.run(eval_genomes, GENERATIONS - p.generation)
+    checkpointer.close()
+    fitness_cache.report()
+    rotation_cache.report()
 
     with open("best_genome.pkl", "wb") as f:
         pickle.dump(winner, f)
@@ -322,6 +371,20 @@ def run_neat(config_file):
 # --- Visualizar o melhor agente ---
 
 
+def replay(genome, config, render=False):
+    # Jogo na seed em que o genoma foi avaliado no treino e a função que joga
+    # um passo dele, com as mesmas redes e ações do simulate_genomes
+    nets = BatchedNetworks.create([genome], config)
+    n_nearest = (config.genome_config.num_inputs - 3) // 4
+    seeds = getattr(genome, 'eval_seeds', None) or [None]
+    game = SpaceShooterGame(render=render, n_nearest=n_nearest,
+                            seed=seeds[0])
+
+    def step():
+        game.step(genome_actions(nets.activate(game.state))[0], DT)
+    return game, step
+
+
 def play_best(config_file, genome_file):
     config = neat.Config(
         neat.DefaultGenome,
@@ -332,22 +395,27 @@ def play_best(config_file, genome_file):
     )
     with open(genome_file, "rb") as f:
         genome = pickle.load(f)
-    net = neat.nn.FeedForwardNetwork.create(genome, config)
-    game = SpaceShooterGame(render=True)
-    clock = pygame.time.Clock()
-    while game.running:
-        dt = clock.tick(60)/1000
+    game, step = replay(genome, config, render=True)
+    # Passo fixo DT, igual ao do treino; a tela é desenhada em até
+    # FPS_CAP quadros/s, interpolando entre os passos
+    loop = fixed_step.FixedStepLoop(step_dt=DT, fps_cap=FPS_CAP)
+    playing = True
+    while playing and game.running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                game.running = False
-        state = game.get_state()
-        output = net.activate(state)
-        move_x = 1 if output[0] > 0.5 else (-1 if output[0] < -0.5 else 0)
-        move_y = 1 if output[1] > 0.5 else (-1 if output[1] < -0.5 else 0)
-        shoot = 1 if output[2] > 0.5 else 0
-        game.step([move_x, move_y, shoot], dt)
-        game.draw()
-        print("Score do melhor agente:", game.score)
+                playing = False
+        for _ in range(loop.frame()):
+            if not game.running:
+                break
+            step()
+        game.draw(loop.alpha)
+    print("Score do melhor agente:", game.score)
+    # Sem seed gravada o jogo foi outro: não há o que comparar
+    if (not game.running and getattr(genome, 'eval_seeds', None)
+            and genome.fitness is not None):
+        print(f"Fitness do replay: {game.fitness:.2f} "
+              f"(treino: {genome.fitness:.2f})")
+    rotation_cache.report()
     game.quit()
 
 # --- Main ---
@@ -356,7 +424,17 @@ def play_best(config_file, genome_file):
 if __name__ == "__main__":
     if len(sys.argv) == 2 and sys.argv[1] == "train":
         run_neat("config-feedforward.txt")
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "resume":
+        path = (sys.argv[2] if len(sys.argv) == 3 else
+                checkpoint.latest_checkpoint(prefix=CHECKPOINT_PREFIX))
+        if path is None:
+            print("Nenhum checkpoint encontrado em",
+                  checkpoint.DEFAULT_DIRECTORY)
+        else:
+            run_neat("config-feedforward.txt", resume_from=path)
     elif len(sys.argv) == 2 and sys.argv[1] == "play":
         play_best("config-feedforward.txt", "best_genome.pkl")
     else:
-        print("Use:\n  python space_shooter_neat.py train\n  python space_shooter_neat.py play")
+        print("Use:\n  python space_shooter_neat.py train [--profile]\n"
+              "  python space_shooter_neat.py resume [checkpoint]\n"
+              "  python space_shooter_neat.py play")
@@ -0,0 +1,66 @@
+from abc import ABCMeta, abstractmethod
+
+import pygame
+
+import profiling
+
+# Lista livre de sprites: objetos destruídos com kill() voltam para o pool e
+# são reinicializados com spawn() em vez de alocar um sprite novo (e o
+# Vector2/FRect dele) a cada meteoro, laser ou explosão.
+
+
+class PooledSprite(pygame.sprite.Sprite, metaclass=ABCMeta):
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    @abstractmethod
+    def spawn(self, *args, **kwargs):
+        # (Re)inicializa o sprite com os argumentos de SpritePool.acquire
+        pass
+
+    def kill(self):
+        # kill() repetido (ex.: spritecollide + laser.kill) não devolve o
+        # mesmo objeto duas vezes
+        if self.alive():
+            super().kill()
+            # Posição interpolada (fixed_step) da vida anterior não vale mais
+            self.__dict__.pop('previous_center', None)
+            self.pool.free.append(self)
+
+
+class SpritePool:
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, groups, *args, **kwargs):
+        if self.free:
+            sprite = self.free.pop()
+            self.reused += 1
+        else:
+            sprite = self.sprite_class(self)
+            self.created += 1
+        sprite.spawn(*args, **kwargs)
+        sprite.add(*groups)
+        return sprite
+
+    def stats(self):
+        return {'created': self.created, 'reused': self.reused,
+                'free': len(self.free)}
+
+
+def pool_stats(pools):
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+def record_churn(pools, before):
+    # Soma no profiling os sprites criados e reusados desde `before`
+    # (pool_stats de antes do trecho medido, ex.: um job de avaliação)
+    for name, pool in pools.items():
+        stats = pool.stats()
+        for key in ('created', 'reused'):
+            profiling.add(f'pool.{name}.{key}', 0.0,
+                          stats[key] - before[name][key])